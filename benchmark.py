@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试 - 生成合成的源文件，分阶段计时合并流程
+
+示例:
+    python benchmark.py --files 20 --rows 5000 --cols 15
+    python benchmark.py --preset wide --json result.json
+    python benchmark.py --preset default --baseline result.json   # 与上次结果对比，变慢超过阈值时退出码为 1
+
+各阶段：扫描目录、读取 Sheet 列表、提取数据、汇总、估算列宽、保存。汇总阶段把数据行编码进
+RowStore 并判断第一列是否重新编号，编号本身在遍历数据行时进行，计入估算列宽和保存阶段。
+报告每个阶段的耗时、吞吐量（行/秒、MB/秒）以及阶段结束时进程的峰值内存。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import string
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+import openpyxl
+
+from instrumentation import peak_rss_mb
+from merger import ExcelMerger, ColumnWidthEstimator
+
+
+SHEET_NAME = "明细"
+
+PRESETS = {
+    "default": dict(files=20, rows=5000, cols=12, sparsity=0.1, shared_ratio=0.5, header_rows=1),
+    "many-files": dict(files=200, rows=500, cols=12, sparsity=0.1, shared_ratio=0.5, header_rows=1),
+    "large": dict(files=4, rows=100000, cols=12, sparsity=0.1, shared_ratio=0.5, header_rows=1),
+    "wide": dict(files=10, rows=2000, cols=120, sparsity=0.3, shared_ratio=0.5, header_rows=2),
+    "sparse": dict(files=20, rows=5000, cols=30, sparsity=0.8, shared_ratio=0.5, header_rows=1),
+    "unique-strings": dict(files=20, rows=5000, cols=12, sparsity=0.1, shared_ratio=0.0, header_rows=1),
+}
+
+
+def generate_workbooks(directory, files, rows, cols, sparsity, shared_ratio, header_rows, seed=0):
+    """
+    生成合成的源文件
+
+    Args:
+        directory (str): 输出目录
+        files (int): 文件数
+        rows (int): 每个文件的数据行数
+        cols (int): 列数
+        sparsity (float): 单元格为空的概率
+        shared_ratio (float): 文本单元格取自少量重复词汇（共享字符串）的比例，其余为唯一文本
+        header_rows (int): 表头行数
+        seed (int): 随机种子，保证结果可重复
+
+    Returns:
+        list: 生成的文件路径，按修改时间递增
+    """
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choices(string.ascii_letters, k=rng.randint(4, 12))) for _ in range(200)]
+    # 列类型循环使用：序号列之后依次为文本、整数、小数、日期
+    kinds = ["text", "int", "float", "date"]
+    base_date = datetime(2024, 1, 1)
+    paths = []
+
+    for file_idx in range(files):
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(SHEET_NAME)
+        wb.create_sheet("说明")
+
+        for header_idx in range(header_rows):
+            ws.append([f"列{c + 1}" if header_idx == header_rows - 1 else f"分组{c // 4 + 1}" for c in range(cols)])
+
+        for row_idx in range(rows):
+            row = [row_idx + 1]
+            for col_idx in range(1, cols):
+                if rng.random() < sparsity:
+                    row.append(None)
+                    continue
+                kind = kinds[(col_idx - 1) % len(kinds)]
+                if kind == "text":
+                    if rng.random() < shared_ratio:
+                        row.append(rng.choice(vocabulary))
+                    else:
+                        row.append(f"{file_idx}-{row_idx}-{col_idx}-{rng.getrandbits(32):08x}")
+                elif kind == "int":
+                    row.append(rng.randint(0, 100000))
+                elif kind == "float":
+                    row.append(round(rng.uniform(0, 10000), 2))
+                else:
+                    row.append(base_date + timedelta(days=rng.randint(0, 3650)))
+            ws.append(row)
+
+        path = os.path.join(directory, f"source_{file_idx:04d}.xlsx")
+        wb.save(path)
+        # 固定修改时间，保证扫描顺序稳定
+        mtime = 1700000000 + file_idx
+        os.utime(path, (mtime, mtime))
+        paths.append(path)
+
+    return paths
+
+
+class StageTimer:
+    """记录各阶段的耗时和吞吐量"""
+
+    def __init__(self):
+        self.stages = []
+
+    def run(self, name, func, rows=None, size_bytes=None):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        stage = {"stage": name, "seconds": round(elapsed, 4), "peak_rss_mb": peak_rss_mb()}
+        if rows is not None:
+            stage["rows"] = rows(result) if callable(rows) else rows
+            stage["rows_per_second"] = round(stage["rows"] / elapsed) if elapsed > 0 else None
+        if size_bytes is not None:
+            stage["mb_per_second"] = round(size_bytes / 1024 / 1024 / elapsed, 2) if elapsed > 0 else None
+        self.stages.append(stage)
+        return result
+
+
+def run_benchmark(source_dir, header_rows, output_format="xlsx", workers=1):
+    """对 source_dir 中的文件执行一次完整合并，返回各阶段结果"""
+    timer = StageTimer()
+
+    files = timer.run("scan", lambda: ExcelMerger.scan_excel_files(source_dir))
+    total_bytes = sum(os.path.getsize(f) for f in files)
+
+    index = timer.run("sheet_index", lambda: ExcelMerger.build_sheet_index(files))
+
+    results = timer.run(
+        "extract",
+        lambda: ExcelMerger.extract_files(files, SHEET_NAME, header_rows, workers),
+        rows=lambda res: sum(r.rows_read for r in res),
+        size_bytes=total_bytes,
+    )
+    rows_total = sum(len(r.data_rows) for r in results)
+
+    header, data_rows, file_order = timer.run(
+        "collect", lambda: ExcelMerger.collect_results(results, header_rows), rows=rows_total
+    )
+
+    def estimate_widths():
+        estimator = ColumnWidthEstimator()
+        for row in header:
+            estimator.observe(row)
+        for row in data_rows:
+            estimator.observe(row)
+        return estimator.widths()
+
+    timer.run("column_widths", estimate_widths, rows=rows_total)
+
+    output_dir = tempfile.mkdtemp(prefix="excel_merger_bench_out_")
+    try:
+        output_path = timer.run(
+            "save",
+            lambda: ExcelMerger.create_output_file(
+                header, data_rows, SHEET_NAME, file_order, index.union, output_dir, output_format=output_format
+            ),
+            rows=rows_total,
+        )
+        output_bytes = os.path.getsize(output_path) if output_path else 0
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return {
+        "files": len(files),
+        "source_mb": round(total_bytes / 1024 / 1024, 2),
+        "output_mb": round(output_bytes / 1024 / 1024, 2),
+        "rows": rows_total,
+        "total_seconds": round(sum(s["seconds"] for s in timer.stages), 4),
+        "stages": timer.stages,
+    }
+
+
+def print_report(report):
+    print(f"\n文件数: {report['files']}  源文件: {report['source_mb']} MB  "
+          f"数据行: {report['rows']}  输出: {report['output_mb']} MB")
+    print(f"{'阶段':<18}{'耗时(s)':>10}{'行/秒':>12}{'MB/秒':>10}{'峰值内存(MB)':>14}")
+    for stage in report["stages"]:
+        rps = stage.get("rows_per_second")
+        mbps = stage.get("mb_per_second")
+        print(f"{stage['stage']:<18}{stage['seconds']:>10.3f}"
+              f"{rps if rps is not None else '-':>12}"
+              f"{mbps if mbps is not None else '-':>10}"
+              f"{stage['peak_rss_mb'] if stage['peak_rss_mb'] is not None else '-':>14}")
+    print(f"{'total':<18}{report['total_seconds']:>10.3f}")
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    与基线对比，返回变慢超过阈值的阶段列表
+
+    只比较耗时超过 10 毫秒的阶段，避免计时噪声造成误报。
+    """
+    baseline_stages = {s["stage"]: s for s in baseline.get("stages", [])}
+    regressions = []
+    for stage in report["stages"]:
+        base = baseline_stages.get(stage["stage"])
+        if not base or base["seconds"] < 0.01:
+            continue
+        ratio = stage["seconds"] / base["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append((stage["stage"], base["seconds"], stage["seconds"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Excel 合并流程性能基准测试")
+    parser.add_argument("--preset", choices=sorted(PRESETS), help="预设的数据规模，可被下列参数覆盖")
+    parser.add_argument("--files", type=int, help="文件数")
+    parser.add_argument("--rows", type=int, help="每个文件的数据行数")
+    parser.add_argument("--cols", type=int, help="列数")
+    parser.add_argument("--sparsity", type=float, help="单元格为空的概率 (0-1)")
+    parser.add_argument("--shared-ratio", type=float, help="文本取自重复词汇的比例 (0-1)")
+    parser.add_argument("--header-rows", type=int, help="表头行数")
+    parser.add_argument("--format", default="xlsx", help="输出格式（默认 xlsx）")
+    parser.add_argument("--workers", type=int, default=1, help="提取阶段的进程数")
+    parser.add_argument("--source-dir", help="使用已生成的源文件目录，不再重新生成")
+    parser.add_argument("--keep", action="store_true", help="保留生成的源文件")
+    parser.add_argument("--json", metavar="PATH", help="把结果写入 JSON 文件")
+    parser.add_argument("--baseline", metavar="PATH", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许变慢的比例（默认 0.2 即 20%%）")
+    args = parser.parse_args(argv)
+
+    params = dict(PRESETS[args.preset or "default"])
+    for key in params:
+        value = getattr(args, key)
+        if value is not None:
+            params[key] = value
+
+    generated = args.source_dir is None
+    source_dir = args.source_dir or tempfile.mkdtemp(prefix="excel_merger_bench_src_")
+    try:
+        if generated:
+            print(f"生成合成数据: {params}")
+            start = time.perf_counter()
+            generate_workbooks(source_dir, **params)
+            print(f"生成完成，用时 {time.perf_counter() - start:.1f}s，目录: {source_dir}")
+
+        report = run_benchmark(source_dir, params["header_rows"], args.format, args.workers)
+        report["params"] = params
+        report["format"] = args.format
+        report["workers"] = args.workers
+    finally:
+        if generated and not args.keep:
+            shutil.rmtree(source_dir, ignore_errors=True)
+
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("\n性能回退:")
+            for name, before, after, ratio in regressions:
+                print(f"  {name}: {before:.3f}s -> {after:.3f}s ({ratio:.2f}x)")
+            return 1
+        print("\n与基线相比没有性能回退")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按表头对齐列 - 各文件的列顺序不同或增减了列时，按列名把数据行重排到统一的列顺序
+
+统一的列顺序取自第一个文件的表头。每个文件只根据自己的表头计算一次索引向量，
+数据行用 operator.itemgetter 按向量整体重排，不对每个单元格查找列名。
+"""
+
+import operator
+from collections import defaultdict
+
+
+def normalize_column_name(value):
+    """列名比较时忽略首尾和连续空白以及大小写"""
+    if value is None:
+        return ""
+    return " ".join(str(value).split()).casefold()
+
+
+def column_keys(header_rows):
+    """
+    每一列的键：最后一行表头中的列名，以及同名列中的序号
+
+    多行表头时上面几行通常是分组标题或报表标题（可能带日期），只用最后一行比较。
+    """
+    last = header_rows[-1] if header_rows else []
+    seen = defaultdict(int)
+    keys = []
+    for value in last:
+        name = normalize_column_name(value)
+        keys.append((name, seen[name]))
+        seen[name] += 1
+    return keys
+
+
+class ColumnMapping:
+    """
+    一个文件到统一列顺序的映射
+
+    vector[i] 为统一顺序中第 i 列在该文件中的位置，该文件缺少的列为 None，重排后总是空值
+    （即使数据行比表头宽，也不会取到表头范围之外的单元格）。
+    """
+
+    def __init__(self, vector, source_width, missing, extra):
+        self.vector = tuple(vector)
+        self.source_width = source_width
+        self.missing = missing
+        self.extra = extra
+        self.identity = self.vector == tuple(range(source_width))
+
+    @property
+    def reordered(self):
+        return not self.identity
+
+    def apply(self, rows):
+        """
+        按索引向量重排数据行，表头范围之外的单元格丢弃
+
+        Returns:
+            list: 重排后的 list 行；映射不改变列顺序时直接返回 rows
+        """
+        if self.identity:
+            return rows
+        width = self.source_width
+        has_missing = None in self.vector
+        # 缺少的列取每行末尾追加的 None（下标 -1），行先补齐到表头宽度
+        positions = [-1 if position is None else position for position in self.vector]
+        if len(positions) == 1:
+            position = positions[0]
+            getter = lambda row: (row[position],)
+        else:
+            getter = operator.itemgetter(*positions)
+        aligned = []
+        for row in rows:
+            if len(row) < width:
+                row = row + [None] * (width - len(row))
+            if has_missing:
+                row = row + [None]
+            aligned.append(list(getter(row)))
+        return aligned
+
+
+class ColumnAligner:
+    """
+    统一的列顺序
+
+    以第一个文件的表头为准；其他文件中出现的新列追加在末尾，header_rows 随之扩展，
+    之前的文件在新列上为空。
+    """
+
+    def __init__(self, header_rows):
+        self.header_rows = [list(row) for row in header_rows]
+        self.keys = column_keys(self.header_rows)
+        self._positions = {key: idx for idx, key in enumerate(self.keys)}
+
+    @property
+    def width(self):
+        return len(self.keys)
+
+    def plan(self, header_rows):
+        """
+        根据一个文件的表头计算映射
+
+        Returns:
+            ColumnMapping: 没有任何相同的非空列名时返回 None，此时只能按位置合并
+        """
+        keys = column_keys(header_rows)
+        if not any(key[0] and key in self._positions for key in keys):
+            return None
+
+        last = header_rows[-1]
+        extra = []
+        for idx, key in enumerate(keys):
+            if key in self._positions:
+                continue
+            self._positions[key] = len(self.keys)
+            self.keys.append(key)
+            for canonical_row, row in zip(self.header_rows, header_rows):
+                canonical_row.extend([None] * (len(self.keys) - 1 - len(canonical_row)))
+                canonical_row.append(row[idx] if idx < len(row) else None)
+            extra.append(last[idx])
+
+        source_positions = {key: idx for idx, key in enumerate(keys)}
+        vector = [source_positions.get(key) for key in self.keys]
+        missing = [
+            self.header_rows[-1][idx] for idx, key in enumerate(self.keys)
+            if key not in source_positions
+        ]
+        return ColumnMapping(vector, len(keys), missing, extra)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重复行检测 - 按整行或指定的键列去除合并结果中的重复行
+
+每行只计算一个 64 位哈希（operator.itemgetter 取出键列后调用 hash），各文件的哈希保存在
+array('q') 中，不复制数据行。精确模式记录每个哈希第一次出现的行，哈希相同时再比较键列的值，
+哈希碰撞的不同行不会被当作重复；近似模式用布隆过滤器，每行只占约 1.5 字节，适合行数极多的合并，
+代价是少量不重复的行可能被误判为重复（概率为 error_rate）。
+"""
+
+import math
+import operator
+import itertools
+from array import array
+
+from column_align import column_keys, normalize_column_name
+
+
+KEEP_FIRST = "first"
+KEEP_LAST = "last"
+
+# 近似模式下把不重复的行误判为重复的概率
+DEFAULT_ERROR_RATE = 0.001
+
+_MASK64 = (1 << 64) - 1
+
+
+def row_hashes(rows, positions):
+    """
+    每行键列的哈希
+
+    Args:
+        rows (list): 数据行，较短的行在缺失的列上视为 None
+        positions (list): 键列在这些行中的位置，None 表示该文件中没有这一列，键值总是 None
+
+    Returns:
+        array: array('q')，与 rows 等长
+    """
+    if not positions:
+        return array("q", itertools.repeat(hash(()), len(rows)))
+    present = [p for p in positions if p is not None]
+    need = max(present) + 1 if present else 0
+    if None in positions:
+        # 缺少的列取每行末尾追加的 None（下标 -1），不会取到比表头宽的行中多出的单元格
+        rows = [(row if len(row) >= need else row + [None] * (need - len(row))) + [None] for row in rows]
+        positions = [-1 if p is None else p for p in positions]
+    elif any(len(row) < need for row in rows):
+        rows = [row if len(row) >= need else row + [None] * (need - len(row)) for row in rows]
+    if len(positions) == 1:
+        # 单列时 itemgetter 返回单元格本身，统一包装成元组
+        keys = zip(map(operator.itemgetter(positions[0]), rows))
+    else:
+        keys = map(operator.itemgetter(*positions), rows)
+    return array("q", map(hash, keys))
+
+
+def row_key(row, positions):
+    """一行键列的值组成的元组，与 row_hashes 计算哈希的元组相同"""
+    return tuple(row[p] if p is not None and p < len(row) else None for p in positions)
+
+
+# 精确模式下行的位置编码为 (文件序号 << _ROW_BITS) | 行号
+_ROW_BITS = 32
+_ROW_MASK = (1 << _ROW_BITS) - 1
+
+
+class _HashIndex:
+    """精确模式：哈希 -> 第一次出现的行的位置，哈希相同时比较键列的值"""
+
+    def __init__(self, expected_rows, key_sources):
+        self._first = {}
+        self._key_sources = key_sources
+
+    def _key(self, location):
+        rows, positions = self._key_sources[location >> _ROW_BITS]
+        return row_key(rows[location & _ROW_MASK], positions)
+
+    def add(self, value, location):
+        """加入位于 location 的行，返回键相同的行之前是否出现过"""
+        first = self._first.get(value)
+        if first is None:
+            self._first[value] = location
+            return False
+        # 哈希相同，比较键本身；碰撞的不同键都保存在列表中
+        candidates = first if isinstance(first, list) else (first,)
+        key = self._key(location)
+        if any(self._key(candidate) == key for candidate in candidates):
+            return True
+        if isinstance(first, list):
+            first.append(location)
+        else:
+            self._first[value] = [first, location]
+        return False
+
+
+class _BloomFilter:
+    """近似模式：布隆过滤器，用两个哈希组合出 k 个位置"""
+
+    def __init__(self, expected_rows, error_rate):
+        expected_rows = max(expected_rows, 1)
+        bits = math.ceil(-expected_rows * math.log(error_rate) / (math.log(2) ** 2))
+        self.size = max(bits, 8)
+        self.hash_count = max(1, round(self.size / expected_rows * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, value, location=None):
+        """加入 value，返回之前是否（可能）出现过；location 不使用"""
+        bits = self._bits
+        size = self.size
+        first = value & _MASK64
+        step = hash((value, 0x9E3779B97F4A7C15)) & _MASK64 | 1
+        seen = True
+        for i in range(self.hash_count):
+            position = (first + i * step) % size
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not bits[byte] & bit:
+                bits[byte] |= bit
+                seen = False
+        return seen
+
+
+class RowDeduplicator:
+    """
+    重复行去除的配置
+
+    同一个实例可以用于多次合并（例如合并全部 Sheet 时的每个 Sheet），每次调用 keep_masks
+    都使用新的索引。
+    """
+
+    def __init__(self, key_columns=None, keep=KEEP_FIRST, approximate=False, error_rate=DEFAULT_ERROR_RATE):
+        """
+        Args:
+            key_columns (list): 键列，列名（按最后一行表头匹配）或从 0 开始的列号；None 表示比较整行
+            keep (str): "first" 保留第一次出现的行，"last" 保留最后一次出现的行
+            approximate (bool): 使用布隆过滤器代替精确的哈希索引
+            error_rate (float): 近似模式下的误判率
+        """
+        if keep not in (KEEP_FIRST, KEEP_LAST):
+            raise ValueError(f"keep 只能是 '{KEEP_FIRST}' 或 '{KEEP_LAST}'")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate 必须在 0 和 1 之间")
+        self.key_columns = list(key_columns) if key_columns else None
+        self.keep = keep
+        self.approximate = approximate
+        self.error_rate = error_rate
+
+    def key_positions(self, header_rows, width):
+        """
+        键列在统一列顺序中的位置
+
+        Args:
+            header_rows (list): 统一的表头行
+            width (int): 整行比较时的列数
+
+        Returns:
+            list: 列位置
+        """
+        if self.key_columns is None:
+            return list(range(width))
+
+        names = {}
+        for idx, (name, occurrence) in enumerate(column_keys(header_rows)):
+            if occurrence == 0 and name:
+                names[name] = idx
+        positions = []
+        for column in self.key_columns:
+            if isinstance(column, int):
+                if column < 0:
+                    raise ValueError(f"列号不能为负数: {column}")
+                positions.append(column)
+                continue
+            position = names.get(normalize_column_name(column))
+            if position is None:
+                raise ValueError(f"表头中没有列: {column}")
+            positions.append(position)
+        return positions
+
+    def _new_index(self, expected_rows, key_sources):
+        if self.approximate:
+            return _BloomFilter(expected_rows, self.error_rate)
+        if key_sources is None:
+            raise ValueError("精确模式需要 key_sources 以比较键列的值")
+        return _HashIndex(expected_rows, key_sources)
+
+    def keep_masks(self, hash_arrays, key_sources=None):
+        """
+        按合并顺序给出每个文件中要保留的行
+
+        Args:
+            hash_arrays (list): 每个文件的 row_hashes 结果，按合并顺序
+            key_sources (list): 每个文件的 (数据行, 键列位置)，与 hash_arrays 对应；
+                                精确模式下哈希相同时用来比较键列的值，近似模式不需要
+
+        Returns:
+            tuple: (masks, duplicates)，masks 为每个文件的 bytearray（1 表示保留），
+                   duplicates 为每个文件去掉的行数
+        """
+        index = self._new_index(sum(map(len, hash_arrays)), key_sources)
+        masks = [None] * len(hash_arrays)
+        order = range(len(hash_arrays))
+        if self.keep == KEEP_LAST:
+            order = reversed(order)
+
+        add = index.add
+        for file_idx in order:
+            hashes = hash_arrays[file_idx]
+            if len(hashes) > _ROW_MASK:
+                raise ValueError("单个文件的行数过多，无法去重")
+            base = file_idx << _ROW_BITS
+            locations = range(base, base + len(hashes))
+            if self.keep == KEEP_LAST:
+                flags = bytearray(map(operator.not_, map(add, reversed(hashes), reversed(locations))))
+                flags.reverse()
+            else:
+                flags = bytearray(map(operator.not_, map(add, hashes, locations)))
+            masks[file_idx] = flags
+        duplicates = [len(mask) - sum(mask) for mask in masks]
+        return masks, duplicates
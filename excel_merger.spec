@@ -1,7 +1,15 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import os
+
 block_cipher = None
 
+# EXCEL_MERGER_ONEDIR=1 时生成目录形式（onedir）：exe 与依赖放在同一目录中，
+# 启动时不必像单文件版那样每次把全部依赖解压到临时目录，冷启动更快
+ONEDIR = os.environ.get("EXCEL_MERGER_ONEDIR") == "1"
+
+APP_NAME = 'Excel表格合并工具'
+
 a = Analysis(
     ['excel_merger_gui.py'],
     pathex=[],
@@ -9,7 +17,22 @@ a = Analysis(
     datas=[],
     hiddenimports=[
         'merger',
+        'instrumentation',
+        'incremental',
+        'output_sinks',
+        'parse_cache',
+        'row_batch',
+        'row_store',
+        'column_align',
+        'watcher',
+        'file_scanner',
+        'dedup',
+        'xlsx_fast',
+        'shared_strings',
+        'file_table',
+        'log_console',
         'styles',
+        'xlrd',
     ],
     hookspath=[],
     hooksconfig={},
@@ -29,13 +52,8 @@ a = Analysis(
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='Excel表格合并工具',
+exe_options = dict(
+    name=APP_NAME,
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
@@ -46,3 +64,30 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+if ONEDIR:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        **exe_options,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        name=APP_NAME,
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        **exe_options,
+    )
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel表格合并工具 - 命令行版本，适用于无界面的批处理和定时任务
+
+示例:
+    python excel_merger_cli.py ./data --sheet 明细 --header-rows 2 --output-dir ./out --format csv
+    python excel_merger_cli.py a.xlsx b.xlsx --sheet Sheet1 --json summary.json
+    python excel_merger_cli.py ./data --sheet 明细 --watch
+    python excel_merger_cli.py ./data --sheet 明细 --stream --format csv
+
+合并过程中的日志输出到 stderr，JSON 摘要输出到 stdout（或 --json 指定的文件）。
+--watch 持续监视目录，文件新增、修改或删除后自动增量刷新合并结果，按 Ctrl-C 结束。
+--stream 边读边写，数据行不全部读入内存，适合超出内存的合并。
+--trace 把每个文件和每个阶段的耗时、行数、内存峰值等指标以 JSON Lines 格式追加到指定文件。
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+
+from instrumentation import logger, add_listener, remove_listener, JsonLinesTrace
+from merger import ExcelMerger, OUTPUT_FORMATS
+from output_sinks import DEFAULT_CSV_ENCODING
+from watcher import DEFAULT_DEBOUNCE_SECONDS
+from file_scanner import SORT_KEYS
+from dedup import RowDeduplicator, KEEP_FIRST, KEEP_LAST
+
+
+# 退出码
+EXIT_OK = 0
+EXIT_NO_DATA = 1
+EXIT_USAGE = 2
+EXIT_NO_INPUT = 3
+EXIT_SAVE_FAILED = 4
+EXIT_ERROR = 5
+EXIT_INTERRUPTED = 130
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="excel_merger_cli",
+        description="合并多个 Excel 文件中的同名 Sheet",
+    )
+    parser.add_argument("inputs", nargs="+", help="Excel 文件或目录（目录中的 .xlsx/.xls 按修改时间排序）")
+    parser.add_argument("-r", "--recursive", action="store_true", help="同时扫描输入目录的子目录")
+    parser.add_argument("--include", action="append", metavar="PATTERN",
+                        help="扫描目录时匹配的文件 glob 模式，可重复，默认 *.xlsx 和 *.xls；含 / 的模式匹配相对路径")
+    parser.add_argument("--exclude", action="append", metavar="PATTERN", help="扫描目录时排除的文件或子目录 glob 模式，可重复")
+    parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="mtime",
+                        help="目录中文件的合并顺序（默认 mtime，按修改时间）")
+    parser.add_argument("-s", "--sheet", help="要合并的 Sheet 名称，默认为第一个文件的第一个 Sheet")
+    parser.add_argument("-a", "--all-sheets", action="store_true",
+                        help="一次合并所有 Sheet（每个文件只解析一次）；xlsx 输出为一个文件，csv/parquet 每个 Sheet 一个文件")
+    parser.add_argument("-H", "--header-rows", type=int, default=1, help="表头行数（默认 1）")
+    parser.add_argument("-o", "--output-dir", help="输出目录，默认为第一个文件所在的目录")
+    parser.add_argument("-f", "--format", choices=sorted(OUTPUT_FORMATS), default="xlsx", help="输出格式（默认 xlsx）")
+    parser.add_argument("--encoding", default=DEFAULT_CSV_ENCODING, help=f"CSV 编码（默认 {DEFAULT_CSV_ENCODING}）")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="并行解析的进程数，0 表示使用全部 CPU 核心")
+    parser.add_argument("--incremental", action="store_true", help="复用输出目录中上一次的合并结果，只读取新增或修改过的文件")
+    parser.add_argument("--watch", action="store_true", help="监视输入目录，文件变化后自动增量刷新合并结果（按 Ctrl-C 结束）")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE_SECONDS, metavar="SECONDS",
+                        help=f"监视模式下最后一次变化后等待的秒数（默认 {DEFAULT_DEBOUNCE_SECONDS:g}）")
+    parser.add_argument("--keep-outputs", action="store_true", help="监视模式下保留每次刷新生成的合并结果，默认只保留最新一个")
+    parser.add_argument("--stream", action="store_true",
+                        help="流式合并：边读边写，内存占用恒定；按列位置拼接，不使用缓存和多进程。"
+                             "为判断第一列是否重新编号，写出前会先把所有文件的第一列读一遍（遇到非数字值即停止），"
+                             "第一列都是数字时读取时间约为两倍，可用 --no-renumber 跳过")
+    parser.add_argument("--no-renumber", action="store_true", help="流式合并时第一列保持原值，不预读各文件")
+    parser.add_argument("--no-cache", action="store_true", help="不使用解析结果缓存")
+    parser.add_argument("--fast-xlsx", action="store_true",
+                        help="直接解析 XLSX 工作表 XML 读取单元格值，比 openpyxl 快；无法处理的 Sheet 自动改用 openpyxl")
+    parser.add_argument("--no-align", action="store_true", help="按列位置拼接，不按表头列名对齐各文件的列")
+    parser.add_argument("--dedup", action="store_true", help="去除重复的数据行（默认比较整行）")
+    parser.add_argument("--dedup-key", action="append", metavar="COLUMN",
+                        help="按这些列判断重复，可重复；列名按最后一行表头匹配，纯数字表示第几列（从 1 开始）。隐含 --dedup")
+    parser.add_argument("--keep", choices=[KEEP_FIRST, KEEP_LAST], default=KEEP_FIRST,
+                        help="重复行保留第一次还是最后一次出现（默认 first）")
+    parser.add_argument("--dedup-approximate", action="store_true",
+                        help="用布隆过滤器代替精确的哈希索引，内存占用很小，但约千分之一的不重复行可能被当作重复去掉")
+    parser.add_argument("--spill-rows", type=int, metavar="N", help="内存中最多保留的数据行数，超过的部分暂存到临时文件")
+    parser.add_argument("--json", metavar="PATH", help="把 JSON 摘要写入文件而不是 stdout")
+    parser.add_argument("--trace", metavar="PATH", help="把各文件和各阶段的指标以 JSON Lines 格式追加到文件")
+    parser.add_argument("-q", "--quiet", action="store_true", help="只输出警告和错误")
+    parser.add_argument("-v", "--verbose", action="store_true", help="同时输出各阶段的耗时")
+    return parser
+
+
+def collect_files(inputs, recursive=False, include=None, exclude=None, sort_by="mtime"):
+    """展开输入中的目录，保持给定顺序并去重"""
+    files = []
+    seen = set()
+    for path in inputs:
+        if os.path.isdir(path):
+            candidates = ExcelMerger.scan_excel_files(path, recursive, include, exclude, sort_by)
+        else:
+            candidates = [path]
+        for file_path in candidates:
+            key = os.path.abspath(file_path)
+            if key not in seen:
+                seen.add(key)
+                files.append(file_path)
+    return files
+
+
+def build_deduplicator(args):
+    """根据命令行参数创建 RowDeduplicator，不去重时返回 None"""
+    if not args.dedup and not args.dedup_key:
+        return None
+    key_columns = None
+    if args.dedup_key:
+        key_columns = [int(column) - 1 if column.isdigit() else column for column in args.dedup_key]
+    return RowDeduplicator(key_columns, keep=args.keep, approximate=args.dedup_approximate)
+
+
+def add_duplicate_counts(summary, results):
+    """把各文件去掉的重复行数加入摘要"""
+    duplicates = {result.file_path: result.duplicate_rows for result in results if result.duplicate_rows}
+    if duplicates:
+        summary.setdefault("duplicates", {}).update(duplicates)
+        summary["duplicate_rows"] = sum(summary["duplicates"].values())
+
+
+def run(args):
+    """
+    执行合并
+
+    Returns:
+        dict: JSON 摘要，其中 exit_code 为进程退出码
+    """
+    summary = {
+        "status": "ok",
+        "exit_code": EXIT_OK,
+        "sheet": args.sheet,
+        "format": args.format,
+        "output_path": None,
+        "row_count": 0,
+        "file_count": 0,
+        "file_order": [],
+        "errors": [],
+        "warnings": [],
+    }
+
+    def fail(status, exit_code, message):
+        summary["status"] = status
+        summary["exit_code"] = exit_code
+        summary["message"] = message
+        return summary
+
+    if args.header_rows < 1:
+        return fail("usage_error", EXIT_USAGE, "表头行数必须大于 0")
+    if args.incremental and args.format != "xlsx":
+        return fail("usage_error", EXIT_USAGE, "增量合并只支持 xlsx 输出")
+    if args.incremental and args.all_sheets:
+        return fail("usage_error", EXIT_USAGE, "增量合并不能与 --all-sheets 同时使用")
+    if any(column.isdigit() and int(column) == 0 for column in args.dedup_key or ()):
+        return fail("usage_error", EXIT_USAGE, "--dedup-key 的列号从 1 开始")
+    dedup = build_deduplicator(args)
+    if dedup is not None and (args.incremental or args.watch or args.stream):
+        return fail("usage_error", EXIT_USAGE, "去除重复行不能与增量合并、监视模式或流式合并同时使用")
+    if args.stream and (args.incremental or args.watch or args.all_sheets):
+        return fail("usage_error", EXIT_USAGE, "流式合并不能与 --incremental、--watch 或 --all-sheets 同时使用")
+    if args.no_renumber and not args.stream:
+        return fail("usage_error", EXIT_USAGE, "--no-renumber 只能与 --stream 同时使用")
+    if args.watch:
+        return run_watch(args, summary, fail)
+
+    files = collect_files(args.inputs, args.recursive, args.include, args.exclude, args.sort)
+    summary["file_count"] = len(files)
+    if not files:
+        return fail("no_input", EXIT_NO_INPUT, "未找到任何 Excel 文件")
+
+    index = ExcelMerger.build_sheet_index(files)
+    if not index.sheet_names:
+        return fail("no_input", EXIT_NO_INPUT, "所有文件都无法读取")
+
+    sheet_names = index.union
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(files[0]))
+    os.makedirs(output_dir, exist_ok=True)
+    workers = None if args.workers == 0 else args.workers
+
+    cache = None
+    if not args.no_cache:
+        from parse_cache import ParseCache
+        cache = ParseCache()
+
+    if args.all_sheets:
+        return run_all_sheets(args, files, sheet_names, output_dir, workers, cache, dedup, summary, fail)
+
+    target_sheet = args.sheet
+    if not target_sheet:
+        first_readable = next(f for f in files if f in index.sheet_names)
+        target_sheet = index.sheet_names[first_readable][0]
+    summary["sheet"] = target_sheet
+    if target_sheet not in sheet_names:
+        return fail("no_data", EXIT_NO_DATA, f"所有文件中都没有 Sheet '{target_sheet}'")
+
+    if args.stream:
+        return run_stream(args, files, target_sheet, sheet_names, output_dir, summary, fail)
+
+    if args.incremental:
+        from incremental import incremental_merge
+        result = incremental_merge(
+            files, target_sheet, args.header_rows, sheet_names, output_dir, workers=workers, cache=cache,
+            fast_xlsx=args.fast_xlsx, align_columns=not args.no_align
+        )
+        if result is None:
+            return fail("no_data", EXIT_NO_DATA, "没有找到任何有效数据")
+        summary.update({
+            "output_path": result["output_path"],
+            "row_count": result["row_count"],
+            "file_order": result["file_order"],
+            "reused_files": result["reused_files"],
+            "extracted_files": result["extracted_files"],
+        })
+        return summary
+
+    # 每个文件提取完成后立即交给 collect_results 编码，这里只保留结果的元数据
+    results = []
+
+    def extracted():
+        for result in ExcelMerger.iter_extract_files(
+            files, target_sheet, args.header_rows, workers, cache=cache, fast_xlsx=args.fast_xlsx
+        ):
+            results.append(result)
+            if result.error:
+                summary["errors"].append({"file": result.file_path, "message": result.error})
+            elif result.warning:
+                summary["warnings"].append({"file": result.file_path, "message": result.warning})
+            yield result
+
+    header_rows, data_rows, file_order = ExcelMerger.collect_results(
+        extracted(), args.header_rows, args.spill_rows, align_columns=not args.no_align, dedup=dedup
+    )
+    add_duplicate_counts(summary, results)
+    if data_rows is None:
+        return fail("no_data", EXIT_NO_DATA, "没有找到任何有效数据")
+
+    try:
+        output_path = ExcelMerger.create_output_file(
+            header_rows, data_rows, target_sheet, file_order, sheet_names, output_dir,
+            output_format=args.format, encoding=args.encoding
+        )
+    finally:
+        data_rows.close()
+    if not output_path:
+        return fail("save_failed", EXIT_SAVE_FAILED, "保存文件失败")
+
+    summary.update({
+        "output_path": output_path,
+        "row_count": len(data_rows),
+        "file_order": file_order,
+    })
+    if cache is not None:
+        summary["cache_hits"] = cache.hits
+    return summary
+
+
+def run_all_sheets(args, files, sheet_names, output_dir, workers, cache, dedup, summary, fail):
+    """--all-sheets：一次合并所有 Sheet，摘要中 sheets 给出每个 Sheet 的行数和文件顺序"""
+    summary["sheet"] = None
+    merged = ExcelMerger.merge_all_sheets(
+        files, sheet_names, args.header_rows, workers, cache=cache, spill_rows=args.spill_rows,
+        align_columns=not args.no_align, dedup=dedup, fast_xlsx=args.fast_xlsx
+    )
+    try:
+        output_paths = ExcelMerger.save_merged_sheets(
+            merged, sheet_names, output_dir, output_format=args.format, encoding=args.encoding
+        )
+    finally:
+        for _, data_rows, _ in merged.values():
+            if data_rows is not None:
+                data_rows.close()
+
+    sheets = {
+        name: {"row_count": len(data_rows), "file_order": file_order}
+        for name, (_, data_rows, file_order) in merged.items() if data_rows is not None
+    }
+    summary.update({
+        "output_paths": output_paths,
+        "output_path": output_paths[0] if output_paths else None,
+        "row_count": sum(sheet["row_count"] for sheet in sheets.values()),
+        "sheets": sheets,
+    })
+    if cache is not None:
+        summary["cache_hits"] = cache.hits
+    if not sheets:
+        return fail("no_data", EXIT_NO_DATA, "没有找到任何有效数据")
+    expected = len(sheets) if args.format != "xlsx" else 1
+    if len(output_paths) < expected:
+        return fail("save_failed", EXIT_SAVE_FAILED, "保存文件失败")
+    return summary
+
+
+def run_stream(args, files, target_sheet, sheet_names, output_dir, summary, fail):
+    """--stream：用 stream_merge 边读边写，数据行不全部读入内存"""
+    header_rows, row_iter, file_order = ExcelMerger.stream_merge(
+        files, target_sheet, args.header_rows, renumber=not args.no_renumber
+    )
+    if header_rows is None:
+        return fail("no_data", EXIT_NO_DATA, "没有找到任何有效数据")
+
+    row_count = 0
+
+    def counted():
+        nonlocal row_count
+        for row in row_iter:
+            row_count += 1
+            yield row
+
+    output_path = ExcelMerger.create_output_file(
+        header_rows, counted(), target_sheet, file_order, sheet_names, output_dir,
+        write_only=True, output_format=args.format, encoding=args.encoding
+    )
+    if not output_path:
+        return fail("save_failed", EXIT_SAVE_FAILED, "保存文件失败")
+    if row_count == 0:
+        # 与非流式合并一致：没有数据行时不保留只有表头的文件
+        os.remove(output_path)
+        return fail("no_data", EXIT_NO_DATA, "没有找到任何有效数据")
+
+    summary.update({
+        "output_path": output_path,
+        "row_count": row_count,
+        "file_order": file_order,
+    })
+    return summary
+
+
+def run_watch(args, summary, fail):
+    """--watch：监视一个目录，启动时和每批变化后增量刷新合并结果，直到按 Ctrl-C"""
+    if len(args.inputs) != 1 or not os.path.isdir(args.inputs[0]):
+        return fail("usage_error", EXIT_USAGE, "监视模式需要且只能指定一个目录")
+    if args.format != "xlsx":
+        return fail("usage_error", EXIT_USAGE, "监视模式只支持 xlsx 输出")
+    if args.all_sheets or args.recursive:
+        return fail("usage_error", EXIT_USAGE, "监视模式不能与 --all-sheets 或 --recursive 同时使用")
+    if args.debounce < 0:
+        return fail("usage_error", EXIT_USAGE, "--debounce 不能小于 0")
+
+    from watcher import watch_and_merge
+
+    directory = args.inputs[0]
+    target_sheet = args.sheet
+    if not target_sheet:
+        files = ExcelMerger.scan_excel_files(directory)
+        index = ExcelMerger.build_sheet_index(files)
+        first_readable = next((f for f in files if f in index.sheet_names), None)
+        if first_readable is None:
+            return fail("usage_error", EXIT_USAGE, "目录中还没有可读取的文件，请用 --sheet 指定 Sheet 名称")
+        target_sheet = index.sheet_names[first_readable][0]
+    summary["sheet"] = target_sheet
+    output_dir = args.output_dir or directory
+    os.makedirs(output_dir, exist_ok=True)
+
+    cache = None
+    if not args.no_cache:
+        from parse_cache import ParseCache
+        cache = ParseCache()
+
+    def on_merged(result):
+        summary.update({
+            "output_path": result["output_path"],
+            "row_count": result["row_count"],
+            "file_order": result["file_order"],
+            "file_count": len(result["file_order"]),
+        })
+        summary["refreshes"] = summary.get("refreshes", 0) + 1
+        logger.info(f"已刷新合并结果: {result['output_path']}")
+
+    try:
+        watch_and_merge(
+            directory, target_sheet, args.header_rows, output_dir,
+            workers=None if args.workers == 0 else args.workers, cache=cache,
+            debounce=args.debounce, on_merged=on_merged, prune_previous=not args.keep_outputs,
+            fast_xlsx=args.fast_xlsx, align_columns=not args.no_align
+        )
+    except KeyboardInterrupt:
+        # 正常的结束方式，摘要中保留最后一次刷新的结果
+        pass
+    summary.setdefault("refreshes", 0)
+    return summary
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+
+    # 合并日志输出到 stderr，stdout 只留给 JSON 摘要
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO)
+    trace = JsonLinesTrace(args.trace) if args.trace else None
+    if trace:
+        add_listener(trace)
+    try:
+        summary = run(args)
+    except KeyboardInterrupt:
+        summary = {"status": "interrupted", "exit_code": EXIT_INTERRUPTED}
+    except Exception as e:
+        summary = {"status": "error", "exit_code": EXIT_ERROR, "message": str(e)}
+    finally:
+        if trace:
+            remove_listener(trace)
+            trace.close()
+        logger.removeHandler(handler)
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    text = json.dumps(summary, ensure_ascii=False, indent=2, default=str)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    return summary["exit_code"]
+
+
+if __name__ == "__main__":
+    # 打包为可执行文件后使用多进程需要
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -6,15 +6,142 @@ Excel表格合并工具 - PyQt6 GUI版本
 
 import os
 import sys
+import logging
+import threading
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QListWidget, QFileDialog, QSpinBox,
-    QLabel, QTextEdit, QMessageBox, QComboBox
+    QPushButton, QTableView, QHeaderView, QAbstractItemView, QFileDialog, QSpinBox,
+    QLabel, QMessageBox, QComboBox, QProgressBar, QCheckBox
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, QThread, QTimer, pyqtSignal
 
 from styles import get_stylesheet
-from merger import ExcelMerger
+from instrumentation import logger
+from output_sinks import parquet_available
+from file_table import FileTableModel, COL_ORDER, COL_NAME
+from log_console import LogConsole, ConsoleLogHandler, LEVEL_CHOICES, GUI_LOGGER_NAME, open_log_file, default_log_path
+
+# 合并引擎（merger 及其依赖的 openpyxl、xlrd）导入较慢，在第一次读取 Sheet 或合并时才导入，
+# 窗口显示后再在后台线程中预先导入，参见 preload_engine
+
+
+def preload_engine():
+    """在后台线程中导入合并引擎，用户第一次操作时不必再等待"""
+    def load():
+        try:
+            import merger  # noqa: F401
+            import incremental  # noqa: F401
+        except Exception as e:
+            logger.debug(f"预先导入合并引擎失败: {e}")
+    
+    threading.Thread(target=load, name="preload-engine", daemon=True).start()
+
+
+class MergeWorker(QObject):
+    """在后台线程中执行合并，避免界面卡死"""
+    
+    progress = pyqtSignal(int, int, int)  # 当前文件序号, 文件总数, 当前文件已读取行数
+    saving = pyqtSignal(int)              # 开始保存，参数为合并的数据行数
+    finished = pyqtSignal(object)         # 合并结果 dict，没有有效数据时为 None
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    
+    def __init__(self, files, target_sheet, header_rows_count, sheet_names, target_directory, incremental=False,
+                 output_format="xlsx", all_sheets=False):
+        super().__init__()
+        self.files = files
+        self.target_sheet = target_sheet
+        self.header_rows_count = header_rows_count
+        self.sheet_names = sheet_names
+        self.target_directory = target_directory
+        self.incremental = incremental
+        self.output_format = output_format
+        self.all_sheets = all_sheets
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        """请求取消，可在任意线程调用"""
+        self._cancel_event.set()
+    
+    def run(self):
+        from merger import ExcelMerger, MergeCancelled
+        from parse_cache import ParseCache
+        from incremental import incremental_merge
+        
+        try:
+            cache = ParseCache()
+            if self.incremental:
+                result = incremental_merge(
+                    self.files, self.target_sheet, self.header_rows_count, self.sheet_names,
+                    self.target_directory, progress=self.progress.emit, cancel=self._cancel_event, cache=cache
+                )
+                if result is not None:
+                    result["cache_hits"] = cache.hits
+                self.finished.emit(result)
+                return
+            
+            if self.all_sheets:
+                self.finished.emit(self.run_all_sheets(cache))
+                return
+            
+            header_rows, data_rows, file_order = ExcelMerger.merge_sheets(
+                self.files, self.target_sheet, self.header_rows_count,
+                progress=self.progress.emit, cancel=self._cancel_event, cache=cache
+            )
+            
+            if data_rows is None:
+                self.finished.emit(None)
+                return
+            
+            self.saving.emit(len(data_rows))
+            try:
+                output_path = ExcelMerger.create_output_file(
+                    header_rows, data_rows, self.target_sheet, file_order, self.sheet_names, self.target_directory,
+                    output_format=self.output_format
+                )
+            finally:
+                data_rows.close()
+            
+            self.finished.emit({
+                "output_path": output_path,
+                "row_count": len(data_rows),
+                "file_order": file_order,
+                "cache_hits": cache.hits,
+            })
+        except MergeCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+    
+    def run_all_sheets(self, cache):
+        """一次合并所有 Sheet，每个文件只解析一次"""
+        from merger import ExcelMerger
+        
+        merged = ExcelMerger.merge_all_sheets(
+            self.files, self.sheet_names, self.header_rows_count,
+            progress=self.progress.emit, cancel=self._cancel_event, cache=cache
+        )
+        sheets = {name: value for name, value in merged.items() if value[1] is not None}
+        if not sheets:
+            return None
+        
+        try:
+            self.saving.emit(sum(len(data_rows) for _, data_rows, _ in sheets.values()))
+            output_paths = ExcelMerger.save_merged_sheets(
+                merged, self.sheet_names, self.target_directory, output_format=self.output_format
+            )
+        finally:
+            for _, data_rows, _ in sheets.values():
+                data_rows.close()
+        
+        return {
+            "output_path": output_paths[0] if output_paths else None,
+            "output_paths": output_paths,
+            "row_count": sum(len(data_rows) for _, data_rows, _ in sheets.values()),
+            "file_order": list(dict.fromkeys(name for _, _, order in sheets.values() for name in order)),
+            "sheet_row_counts": {name: len(data_rows) for name, (_, data_rows, _) in sheets.items()},
+            "cache_hits": cache.hits,
+        }
 
 
 class ExcelMergerGUI(QMainWindow):
@@ -25,13 +152,22 @@ class ExcelMergerGUI(QMainWindow):
         self.header_rows_count = 1
         self.selected_files = []
         self.target_directory = None
+        self.merge_thread = None
+        self.merge_worker = None
+        self.log_file_handler = None
+        self.gui_logger = logging.getLogger(GUI_LOGGER_NAME)
         self.init_ui()
         self.setStyleSheet(get_stylesheet())
+        
+        # 引擎和界面的日志都经过 logging：日志框按显示级别过滤，日志文件记录全部
+        self.log_handler = ConsoleLogHandler(self.log_text)
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(self.log_handler)
     
     def init_ui(self):
         """初始化用户界面"""
         self.setWindowTitle("Excel表格合并工具")
-        self.setGeometry(100, 100, 700, 550)
+        self.setGeometry(100, 100, 760, 650)
         
         # 创建中心窗口
         central_widget = QWidget()
@@ -53,9 +189,26 @@ class ExcelMergerGUI(QMainWindow):
         step1_layout.addWidget(self.btn_select_files)
         main_layout.addLayout(step1_layout)
         
-        self.files_list = QListWidget()
-        self.files_list.setMaximumHeight(80)
-        main_layout.addWidget(self.files_list)
+        # 模型/视图：只绘制可见的行，大小、修改时间和估计行数在后台读取，可点击表头排序
+        self.file_model = FileTableModel(self)
+        self.files_table = QTableView()
+        self.files_table.setModel(self.file_model)
+        self.files_table.setMinimumHeight(120)
+        self.files_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.files_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.files_table.setWordWrap(False)
+        self.files_table.setSortingEnabled(True)
+        self.files_table.sortByColumn(COL_ORDER, Qt.SortOrder.AscendingOrder)
+        # 固定行高，视图不必逐行计算高度
+        vertical_header = self.files_table.verticalHeader()
+        vertical_header.setVisible(False)
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(22)
+        horizontal_header = self.files_table.horizontalHeader()
+        horizontal_header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        horizontal_header.setSectionResizeMode(COL_NAME, QHeaderView.ResizeMode.Stretch)
+        horizontal_header.resizeSection(COL_ORDER, 50)
+        main_layout.addWidget(self.files_table, 1)
         
         # 步骤 2: 读取 Sheet 列表
         step2_layout = QHBoxLayout()
@@ -77,6 +230,7 @@ class ExcelMergerGUI(QMainWindow):
         sheet_select_layout.setSpacing(8)
         sheet_select_layout.addWidget(QLabel("选择 Sheet:"))
         self.sheet_combo = QComboBox()
+        self.sheet_combo.currentTextChanged.connect(self.file_model.set_target_sheet)
         sheet_select_layout.addWidget(self.sheet_combo, 2)
         sheet_select_layout.addWidget(QLabel("表头行数:"))
         self.header_spinbox = QSpinBox()
@@ -102,6 +256,18 @@ class ExcelMergerGUI(QMainWindow):
         target_dir_layout.addWidget(self.btn_select_dir)
         main_layout.addLayout(target_dir_layout)
         
+        output_format_layout = QHBoxLayout()
+        output_format_layout.setSpacing(8)
+        output_format_layout.addWidget(QLabel("输出格式:"))
+        self.format_combo = QComboBox()
+        self.format_combo.addItem("Excel (*.xlsx)", "xlsx")
+        self.format_combo.addItem("CSV (*.csv)", "csv")
+        if parquet_available():
+            self.format_combo.addItem("Parquet (*.parquet)", "parquet")
+        self.format_combo.currentIndexChanged.connect(self.update_incremental_state)
+        output_format_layout.addWidget(self.format_combo, 1)
+        main_layout.addLayout(output_format_layout)
+        
         # 步骤 5: 执行合并
         step5_layout = QHBoxLayout()
         step5_layout.setSpacing(8)
@@ -109,17 +275,46 @@ class ExcelMergerGUI(QMainWindow):
         self.btn_merge = QPushButton("开始合并")
         self.btn_merge.clicked.connect(self.merge_files)
         self.btn_merge.setEnabled(False)
+        self.incremental_checkbox = QCheckBox("增量合并")
+        self.incremental_checkbox.setToolTip("复用目标目录中上一次的合并结果，只读取新增或修改过的文件")
+        self.all_sheets_checkbox = QCheckBox("合并全部 Sheet")
+        self.all_sheets_checkbox.setToolTip("一次合并所有 Sheet，每个文件只读取一次；CSV/Parquet 每个 Sheet 输出一个文件")
+        self.all_sheets_checkbox.toggled.connect(self.update_incremental_state)
+        self.btn_cancel = QPushButton("取消")
+        self.btn_cancel.clicked.connect(self.cancel_merge)
+        self.btn_cancel.setEnabled(False)
         step5_layout.addWidget(step5_label)
         step5_layout.addStretch()
+        step5_layout.addWidget(self.all_sheets_checkbox)
+        step5_layout.addWidget(self.incremental_checkbox)
         step5_layout.addWidget(self.btn_merge)
+        step5_layout.addWidget(self.btn_cancel)
         main_layout.addLayout(step5_layout)
         
-        # 日志输出
-        log_label = QLabel("日志:")
-        main_layout.addWidget(log_label)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        self.progress_bar.setTextVisible(True)
+        main_layout.addWidget(self.progress_bar)
         
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
+        # 日志输出：成批刷新、最多保留 DEFAULT_MAX_BLOCKS 行
+        log_header_layout = QHBoxLayout()
+        log_header_layout.setSpacing(8)
+        log_header_layout.addWidget(QLabel("日志:"))
+        log_header_layout.addStretch()
+        log_header_layout.addWidget(QLabel("显示级别:"))
+        self.log_level_combo = QComboBox()
+        for label, level in LEVEL_CHOICES:
+            self.log_level_combo.addItem(label, level)
+        self.log_level_combo.setCurrentIndex(self.log_level_combo.findData(logging.INFO))
+        self.log_level_combo.currentIndexChanged.connect(self.update_log_level)
+        log_header_layout.addWidget(self.log_level_combo)
+        self.log_file_checkbox = QCheckBox("保存完整日志")
+        self.log_file_checkbox.setToolTip(f"把所有级别的日志同时写入滚动日志文件: {default_log_path()}")
+        self.log_file_checkbox.toggled.connect(self.toggle_log_file)
+        log_header_layout.addWidget(self.log_file_checkbox)
+        main_layout.addLayout(log_header_layout)
+        
+        self.log_text = LogConsole()
         self.log_text.setMinimumHeight(150)
         main_layout.addWidget(self.log_text, 1)
         
@@ -137,10 +332,9 @@ class ExcelMergerGUI(QMainWindow):
         if files:
             self.selected_files = files
             
-            # 显示选中的文件
-            self.files_list.clear()
-            for file in self.selected_files:
-                self.files_list.addItem(os.path.basename(file))
+            # 显示选中的文件，表格按合并顺序显示
+            self.file_model.set_files(self.selected_files)
+            self.files_table.sortByColumn(COL_ORDER, Qt.SortOrder.AscendingOrder)
             
             self.log(f"已选择 {len(self.selected_files)} 个文件")
             self.btn_read_sheets.setEnabled(True)
@@ -152,17 +346,32 @@ class ExcelMergerGUI(QMainWindow):
             return
         
         try:
-            # 使用第一个文件获取sheet列表
+            from merger import ExcelMerger
+            
             first_file = self.selected_files[0]
-            self.sheet_names = ExcelMerger.get_sheet_names(first_file)
+            index = ExcelMerger.build_sheet_index(self.selected_files)
+            
+            for error in index.errors.values():
+                self.log(f"错误: {error}", logging.ERROR)
+            
+            if not index.sheet_names:
+                raise Exception("所有文件都无法读取")
+            
+            # 所有文件中出现过的 Sheet 都可以选择
+            self.sheet_names = index.union
+            self.file_model.set_sheet_index(index)
             
             # 更新Sheet选择框
             self.sheet_combo.clear()
             self.sheet_combo.addItems(self.sheet_names)
             
-            self.log(f"成功读取 Sheet 列表，共 {len(self.sheet_names)} 个 Sheet")
+            self.log(f"成功读取 {len(index.sheet_names)} 个文件的 Sheet 列表，共 {len(self.sheet_names)} 个 Sheet")
             for i, sheet in enumerate(self.sheet_names, 1):
-                self.log(f"  {i}. {sheet}")
+                missing = index.files_missing(sheet)
+                if missing:
+                    self.log(f"  {i}. {sheet}（{len(missing)} 个文件中不存在）")
+                else:
+                    self.log(f"  {i}. {sheet}")
             
             # 设置默认目标目录为第一个文件所在的目录
             default_dir = os.path.dirname(os.path.abspath(first_file))
@@ -177,7 +386,7 @@ class ExcelMergerGUI(QMainWindow):
             
         except Exception as e:
             QMessageBox.critical(self, "错误", f"读取 Sheet 失败: {e}")
-            self.log(f"错误: {e}")
+            self.log(f"错误: {e}", logging.ERROR)
     
     def merge_files(self):
         """执行合并"""
@@ -195,51 +404,160 @@ class ExcelMergerGUI(QMainWindow):
         
         target_sheet = self.sheet_combo.currentText()
         self.header_rows_count = self.header_spinbox.value()
+        all_sheets = self.all_sheets_checkbox.isChecked()
         
-        if not target_sheet:
+        if not target_sheet and not all_sheets:
             QMessageBox.warning(self, "警告", "请选择要合并的 Sheet！")
             return
         
-        try:
+        if all_sheets:
+            self.log(f"\n开始合并全部 {len(self.sheet_names)} 个 Sheet")
+        else:
             self.log(f"\n开始合并 Sheet: {target_sheet}")
-            self.log(f"表头行数: {self.header_rows_count}")
-            self.log(f"目标目录: {self.target_directory}")
-            
-            # 进行合并
-            header_rows, data_rows, file_order = ExcelMerger.merge_sheets(
-                self.selected_files, target_sheet, self.header_rows_count
-            )
-            
-            if data_rows is None:
-                QMessageBox.warning(self, "警告", "没有找到任何有效数据！")
-                return
-            
-            self.log(f"合并完成！总共合并了 {len(data_rows)} 行数据")
-            
-            # 保存文件到目标目录
-            output_path = ExcelMerger.create_output_file(
-                header_rows, data_rows, target_sheet, file_order, self.sheet_names, self.target_directory
-            )
-            
-            if output_path:
-                end_header_row = self.header_rows_count
-                if end_header_row == 1:
-                    self.log(f"  - 第1行: 表头（来自第一个文件）")
-                else:
-                    self.log(f"  - 第1-{end_header_row}行: 表头（来自第一个文件）")
-                self.log(f"  - 第{end_header_row + 1}行起: 合并的数据行（共 {len(data_rows)} 行）")
-            
-            self.log(f"\n合并时使用的Excel文件顺序:")
-            if file_order:
-                for i, filename in enumerate(file_order, 1):
-                    self.log(f"  {i}. {filename}")
-            
-            output_filename = os.path.basename(output_path) if output_path else "未知"
-            QMessageBox.information(self, "成功", f"合并完成！\n文件已保存到: {output_filename}")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"合并失败: {e}")
-            self.log(f"错误: {e}")
+        self.log(f"表头行数: {self.header_rows_count}")
+        self.log(f"目标目录: {self.target_directory}")
+        
+        self.merge_thread = QThread()
+        self.merge_worker = MergeWorker(
+            list(self.selected_files), target_sheet, self.header_rows_count,
+            list(self.sheet_names), self.target_directory,
+            incremental=self.incremental_checkbox.isChecked(),
+            output_format=self.format_combo.currentData(),
+            all_sheets=all_sheets
+        )
+        self.merge_worker.moveToThread(self.merge_thread)
+        self.merge_thread.started.connect(self.merge_worker.run)
+        self.merge_worker.progress.connect(self.on_merge_progress)
+        self.merge_worker.saving.connect(self.on_merge_saving)
+        self.merge_worker.finished.connect(self.on_merge_finished)
+        self.merge_worker.failed.connect(self.on_merge_failed)
+        self.merge_worker.cancelled.connect(self.on_merge_cancelled)
+        for signal in (self.merge_worker.finished, self.merge_worker.failed, self.merge_worker.cancelled):
+            signal.connect(self.merge_thread.quit)
+        self.merge_thread.finished.connect(self.on_merge_thread_finished)
+        
+        self.progress_bar.setRange(0, len(self.selected_files))
+        self.progress_bar.setValue(0)
+        self.set_merging(True)
+        self.merge_thread.start()
+    
+    def cancel_merge(self):
+        """取消正在进行的合并"""
+        if self.merge_worker is not None:
+            self.merge_worker.cancel()
+            self.btn_cancel.setEnabled(False)
+            self.log("正在取消...")
+    
+    def set_merging(self, merging):
+        """合并期间禁用其他操作"""
+        self.btn_select_files.setEnabled(not merging)
+        self.btn_read_sheets.setEnabled(not merging and bool(self.selected_files))
+        self.btn_select_dir.setEnabled(not merging and bool(self.sheet_names))
+        self.format_combo.setEnabled(not merging)
+        self.all_sheets_checkbox.setEnabled(not merging)
+        self.btn_cancel.setEnabled(merging)
+        if merging:
+            self.incremental_checkbox.setEnabled(False)
+            self.btn_merge.setEnabled(False)
+        else:
+            self.update_incremental_state()
+            self.update_merge_button_state()
+    
+    def update_incremental_state(self):
+        """增量合并需要读取上一次的 XLSX 结果，只在输出 XLSX 且只合并一个 Sheet 时可用"""
+        available = self.format_combo.currentData() == "xlsx" and not self.all_sheets_checkbox.isChecked()
+        if not available:
+            self.incremental_checkbox.setChecked(False)
+        self.incremental_checkbox.setEnabled(available)
+        self.sheet_combo.setEnabled(not self.all_sheets_checkbox.isChecked())
+    
+    def on_merge_progress(self, file_index, file_count, rows_read):
+        """后台线程汇报的进度"""
+        self.progress_bar.setValue(file_index)
+        if file_index >= file_count:
+            self.progress_bar.setFormat(f"已读取 {file_count}/{file_count} 个文件")
+            return
+        
+        filename = os.path.basename(self.merge_worker.files[file_index])
+        if rows_read == 0:
+            self.log(f"正在读取 ({file_index + 1}/{file_count}): {filename}")
+        self.progress_bar.setFormat(f"{file_index + 1}/{file_count} {filename} - 已读取 {rows_read} 行")
+    
+    def on_merge_saving(self, row_count):
+        self.log(f"合并完成！总共合并了 {row_count} 行数据")
+        self.log("正在保存...")
+        # 保存阶段无法细分进度，显示为忙碌状态
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setFormat("正在保存...")
+    
+    def on_merge_finished(self, result):
+        self.reset_progress_bar()
+        
+        if result is None:
+            QMessageBox.warning(self, "警告", "没有找到任何有效数据！")
+            return
+        
+        output_path = result["output_path"]
+        file_order = result["file_order"]
+        
+        if result.get("reused_files"):
+            self.log(f"增量合并: {result['reused_files']} 个文件复用上一次的结果，{result['extracted_files']} 个文件重新读取")
+        
+        if result["cache_hits"] and "sheet_row_counts" in result:
+            self.log(f"其中 {result['cache_hits']} 个 Sheet 所在的文件未修改，已从缓存加载")
+        elif result["cache_hits"]:
+            self.log(f"其中 {result['cache_hits']} 个文件未修改，已从缓存加载")
+        
+        if output_path:
+            end_header_row = self.header_rows_count
+            if end_header_row == 1:
+                self.log(f"  - 第1行: 表头（来自第一个文件）")
+            else:
+                self.log(f"  - 第1-{end_header_row}行: 表头（来自第一个文件）")
+            self.log(f"  - 第{end_header_row + 1}行起: 合并的数据行（共 {result['row_count']} 行）")
+            for sheet_name, row_count in result.get("sheet_row_counts", {}).items():
+                self.log(f"  - Sheet {sheet_name}: {row_count} 行")
+        
+        self.log(f"\n合并时使用的Excel文件顺序:")
+        if file_order:
+            for i, filename in enumerate(file_order, 1):
+                self.log(f"  {i}. {filename}")
+        
+        output_paths = result.get("output_paths") or [output_path]
+        output_filename = "\n".join(os.path.basename(path) for path in output_paths if path) or "未知"
+        QMessageBox.information(self, "成功", f"合并完成！\n文件已保存到: {output_filename}")
+    
+    def on_merge_failed(self, message):
+        self.reset_progress_bar()
+        QMessageBox.critical(self, "错误", f"合并失败: {message}")
+        self.log(f"错误: {message}", logging.ERROR)
+    
+    def on_merge_cancelled(self):
+        self.reset_progress_bar()
+        self.log("合并已取消")
+    
+    def on_merge_thread_finished(self):
+        self.merge_worker.deleteLater()
+        self.merge_thread.deleteLater()
+        self.merge_worker = None
+        self.merge_thread = None
+        self.set_merging(False)
+    
+    def reset_progress_bar(self):
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        self.progress_bar.resetFormat()
+    
+    def closeEvent(self, event):
+        """关闭窗口时停止后台合并"""
+        if self.merge_thread is not None:
+            self.merge_worker.cancel()
+            self.merge_thread.quit()
+            self.merge_thread.wait()
+        self.file_model.shutdown()
+        logger.removeHandler(self.log_handler)
+        self.toggle_log_file(False)
+        super().closeEvent(event)
     
     def select_target_directory(self):
         """选择目标目录"""
@@ -265,19 +583,35 @@ class ExcelMergerGUI(QMainWindow):
         )
         self.btn_merge.setEnabled(can_merge)
     
-    def log(self, message):
-        """输出日志"""
-        self.log_text.append(message)
-        # 自动滚动到最新位置
-        self.log_text.verticalScrollBar().setValue(
-            self.log_text.verticalScrollBar().maximum()
-        )
+    def log(self, message, level=logging.INFO):
+        """输出日志：经过 logging 进入日志框（成批显示），开启时同时写入日志文件"""
+        self.gui_logger.log(level, message)
+    
+    def update_log_level(self):
+        self.log_text.set_level(self.log_level_combo.currentData())
+    
+    def toggle_log_file(self, enabled):
+        """开启或关闭完整日志文件"""
+        if enabled and self.log_file_handler is None:
+            try:
+                self.log_file_handler = open_log_file()
+            except OSError as e:
+                self.log(f"错误: 无法创建日志文件: {e}", logging.ERROR)
+                self.log_file_checkbox.setChecked(False)
+                return
+            logger.addHandler(self.log_file_handler)
+            self.log(f"完整日志写入: {self.log_file_handler.baseFilename}")
+        elif not enabled and self.log_file_handler is not None:
+            logger.removeHandler(self.log_file_handler)
+            self.log_file_handler.close()
+            self.log_file_handler = None
 
 
 def main():
     app = QApplication(sys.argv)
     window = ExcelMergerGUI()
     window.show()
+    QTimer.singleShot(0, preload_engine)
     sys.exit(app.exec())
 
 
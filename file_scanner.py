@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件扫描模块 - 用 os.scandir 扫描目录（可递归），返回带大小和修改时间的文件记录
+
+os.scandir 在列目录时就带回了文件类型，Windows 上还带回了大小和修改时间，
+每个文件最多 stat 一次，结果保存在 FileRecord 中供排序和后续阶段使用，不再对每个文件
+调用 os.path.getmtime。递归扫描时每个子目录作为一个任务交给线程池，各子树并行遍历。
+"""
+
+import os
+import fnmatch
+import posixpath
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from instrumentation import logger
+
+
+# 默认匹配的文件
+DEFAULT_INCLUDE = ("*.xlsx", "*.xls")
+
+# 递归扫描时的线程数
+SCAN_WORKERS = 8
+
+# 排序方式 -> 排序键
+SORT_KEYS = {
+    "mtime": lambda record: (record.mtime_ns, record.relpath),
+    "name": lambda record: (record.name.casefold(), record.relpath),
+    "path": lambda record: record.relpath.casefold(),
+    "size": lambda record: (record.size, record.relpath),
+}
+
+
+def _is_output_or_lock(name):
+    """合并结果或 Excel 打开文件时生成的 "~$" 锁文件，扫描时总是排除"""
+    return "合并结果" in name or name.startswith("~$")
+
+
+class FileRecord:
+    """扫描到的一个文件"""
+
+    __slots__ = ("path", "relpath", "size", "mtime_ns")
+
+    def __init__(self, path, relpath, size, mtime_ns):
+        self.path = path
+        # 相对于扫描目录的路径，统一用 "/" 分隔
+        self.relpath = relpath
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @property
+    def name(self):
+        return posixpath.basename(self.relpath)
+
+    @property
+    def mtime(self):
+        """修改时间（秒），与 os.path.getmtime 相同"""
+        return self.mtime_ns / 1e9
+
+    def __repr__(self):
+        return f"FileRecord({self.path!r}, size={self.size}, mtime_ns={self.mtime_ns})"
+
+
+def _compile(patterns):
+    """
+    把 glob 模式转换为 (匹配相对路径的模式, 匹配文件名的模式)，大小写不敏感
+
+    含 "/" 的模式匹配相对路径（如 "2024/*/*.xlsx"），否则只匹配文件名或目录名。
+    """
+    path_patterns = []
+    name_patterns = []
+    for pattern in patterns:
+        pattern = pattern.replace("\\", "/").casefold()
+        (path_patterns if "/" in pattern else name_patterns).append(pattern)
+    return path_patterns, name_patterns
+
+
+def _matches(compiled, relpath, name):
+    path_patterns, name_patterns = compiled
+    relpath = relpath.casefold()
+    name = name.casefold()
+    return (
+        any(fnmatch.fnmatchcase(name, pattern) for pattern in name_patterns)
+        or any(fnmatch.fnmatchcase(relpath, pattern) for pattern in path_patterns)
+    )
+
+
+class _Scan:
+    """一次扫描的参数"""
+
+    def __init__(self, root, include, exclude):
+        self.root = root
+        self.include = _compile(include)
+        self.exclude = _compile(exclude)
+
+    def scan_directory(self, path, relative):
+        """
+        扫描一层目录
+
+        Returns:
+            tuple: (文件记录列表, [(子目录路径, 相对路径)])
+        """
+        records = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    relpath = relative + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not _matches(self.exclude, relpath, entry.name):
+                                subdirs.append((entry.path, relpath + "/"))
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if _is_output_or_lock(entry.name):
+                        continue
+                    if not _matches(self.include, relpath, entry.name) or _matches(self.exclude, relpath, entry.name):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # 扫描过程中被删除
+                        continue
+                    records.append(FileRecord(entry.path, relpath, stat.st_size, stat.st_mtime_ns))
+        except OSError as e:
+            logger.warning(f"  警告: 无法读取目录 {path}: {e}")
+        return records, subdirs
+
+
+def scan_files(directory=".", recursive=False, include=None, exclude=None, sort_by="mtime", reverse=False,
+               workers=SCAN_WORKERS):
+    """
+    扫描目录中的 Excel 文件
+
+    合并结果（文件名含 "合并结果"）和 "~$" 锁文件总是排除。不跟随指向目录的符号链接。
+
+    Args:
+        directory (str): 要扫描的目录
+        recursive (bool): 是否扫描子目录
+        include (list): 文件的 glob 模式，默认为 *.xlsx 和 *.xls
+        exclude (list): 排除的 glob 模式，匹配到的目录整个跳过
+        sort_by (str): 排序方式，"mtime"（修改时间）、"name"、"path"、"size"，None 表示按扫描顺序
+        reverse (bool): 是否倒序
+        workers (int): 递归扫描时的线程数
+
+    Returns:
+        list: FileRecord 列表
+    """
+    if sort_by is not None and sort_by not in SORT_KEYS:
+        raise ValueError(f"不支持的排序方式: {sort_by}")
+
+    scan = _Scan(directory, include or DEFAULT_INCLUDE, exclude or ())
+    records, subdirs = scan.scan_directory(directory, "")
+
+    if recursive and subdirs:
+        if workers is not None and workers <= 1:
+            while subdirs:
+                found, more = scan.scan_directory(*subdirs.pop())
+                records.extend(found)
+                subdirs.extend(more)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = {executor.submit(scan.scan_directory, *subdir) for subdir in subdirs}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        found, more = future.result()
+                        records.extend(found)
+                        pending.update(executor.submit(scan.scan_directory, *subdir) for subdir in more)
+
+    if sort_by is not None:
+        records.sort(key=SORT_KEYS[sort_by], reverse=reverse)
+    return records
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件列表模型 - 选择数千个文件时仍能即时显示、排序和查看
+
+QTableView 只绘制可见的行，模型中每个文件只保存一条轻量记录，选择文件时不做任何磁盘读取。
+大小、修改时间和估计行数（所选 Sheet 的 <dimension>）由后台线程池分批读取，结果放入队列，
+界面线程定时取出后一次性通知视图更新，不会为每个文件发出一次信号。
+"包含 Sheet" 一列来自读取 Sheet 列表时得到的 SheetIndex。
+
+排序只改变显示顺序，合并仍按选择文件时的顺序（"序号" 一列）进行。
+"""
+
+import os
+import queue
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+
+
+# 后台读取元数据的线程数
+METADATA_WORKERS = 4
+
+# 每个后台任务读取的文件数
+LOAD_BATCH = 64
+
+# 界面线程取出读取结果的间隔（毫秒）
+FLUSH_INTERVAL_MS = 100
+
+COLUMNS = ("序号", "文件名", "大小", "修改时间", "包含 Sheet", "估计行数")
+COL_ORDER, COL_NAME, COL_SIZE, COL_MTIME, COL_SHEET, COL_ROWS = range(len(COLUMNS))
+
+# 包含 Sheet 一列的取值
+SHEET_PRESENT = "是"
+SHEET_MISSING = "否"
+SHEET_UNREADABLE = "无法读取"
+
+
+def format_size(size):
+    """字节数 -> 便于阅读的大小"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class FileEntry:
+    """列表中的一个文件"""
+
+    __slots__ = ("order", "path", "name", "size", "mtime", "rows")
+
+    def __init__(self, order, path):
+        # 选择时的顺序（从 1 开始），即合并顺序
+        self.order = order
+        self.path = path
+        self.name = os.path.basename(path)
+        # 以下由后台线程读取，None 表示尚未读取或无法读取
+        self.size = None
+        self.mtime = None
+        self.rows = None
+
+
+def _load_metadata(entries, sheet):
+    """
+    在后台线程中读取一批文件的大小、修改时间和估计行数
+
+    Returns:
+        list: (entry, size, mtime, rows)
+    """
+    # xlsx_fast 依赖 openpyxl，在后台线程中才导入，不影响界面启动
+    from xlsx_fast import estimate_rows
+
+    results = []
+    for entry in entries:
+        try:
+            stat = os.stat(entry.path)
+            size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            size = mtime = None
+        rows = estimate_rows(entry.path, sheet) if sheet and size is not None else None
+        results.append((entry, size, mtime, rows))
+    return results
+
+
+class FileTableModel(QAbstractTableModel):
+    """
+    选中文件的表格模型
+
+    用法：set_files() 设置文件；读取 Sheet 列表后调用 set_sheet_index()，
+    所选 Sheet 变化时调用 set_target_sheet()；关闭窗口前调用 shutdown()。
+    """
+
+    def __init__(self, parent=None, workers=METADATA_WORKERS):
+        super().__init__(parent)
+        self.workers = workers
+        self._entries = []
+        # FileEntry.order -> 当前所在的行
+        self._rows = {}
+        self._sheet_index = None
+        self._target_sheet = None
+        self._executor = None
+        self._futures = []
+        self._results = queue.SimpleQueue()
+        # 每次重新读取时递增，忽略过期任务的结果
+        self._generation = 0
+        self._timer = QTimer(self)
+        self._timer.setInterval(FLUSH_INTERVAL_MS)
+        self._timer.timeout.connect(self._flush)
+
+    # ---- Qt 模型接口 ----
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._entries[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == COL_ORDER:
+                return entry.order
+            if column == COL_NAME:
+                return entry.name
+            if column == COL_SIZE:
+                return format_size(entry.size) if entry.size is not None else ""
+            if column == COL_MTIME:
+                return datetime.fromtimestamp(entry.mtime).strftime("%Y-%m-%d %H:%M") if entry.mtime is not None else ""
+            if column == COL_SHEET:
+                return self.sheet_status(entry.path) or ""
+            if column == COL_ROWS:
+                return f"{entry.rows:,}" if entry.rows is not None else ""
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            return entry.path
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column in (COL_ORDER, COL_SIZE, COL_ROWS):
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """按列排序，尚未读取或无法读取的值总是排在最后"""
+        key = self._sort_key(column)
+        known = [entry for entry in self._entries if key(entry) is not None]
+        unknown = [entry for entry in self._entries if key(entry) is None]
+        known.sort(key=key, reverse=order == Qt.SortOrder.DescendingOrder)
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        moved = [(self._entries[index.row()], index.column()) for index in persistent]
+        self._entries = known + unknown
+        self._reindex()
+        self.changePersistentIndexList(
+            persistent, [self.index(self._rows[entry.order], col) for entry, col in moved]
+        )
+        self.layoutChanged.emit()
+
+    def _sort_key(self, column):
+        if column == COL_NAME:
+            return lambda entry: entry.name.casefold()
+        if column == COL_SIZE:
+            return lambda entry: entry.size
+        if column == COL_MTIME:
+            return lambda entry: entry.mtime
+        if column == COL_SHEET:
+            ranks = {SHEET_PRESENT: 0, SHEET_MISSING: 1, SHEET_UNREADABLE: 2}
+            return lambda entry: ranks.get(self.sheet_status(entry.path))
+        if column == COL_ROWS:
+            return lambda entry: entry.rows
+        return lambda entry: entry.order
+
+    # ---- 数据 ----
+
+    def set_files(self, paths):
+        """设置文件列表（按合并顺序），立即显示，元数据在后台读取"""
+        self.beginResetModel()
+        self._entries = [FileEntry(order, path) for order, path in enumerate(paths, 1)]
+        self._reindex()
+        self._sheet_index = None
+        self._target_sheet = None
+        self.endResetModel()
+        self._reload()
+
+    def paths(self):
+        """按合并顺序的文件路径"""
+        return [entry.path for entry in sorted(self._entries, key=lambda entry: entry.order)]
+
+    def set_sheet_index(self, index):
+        """设置读取 Sheet 列表得到的 SheetIndex，更新 "包含 Sheet" 一列"""
+        self._sheet_index = index
+        self._column_changed(COL_SHEET)
+
+    def set_target_sheet(self, sheet):
+        """所选 Sheet 变化：更新 "包含 Sheet" 一列并重新估计行数"""
+        sheet = sheet or None
+        if sheet == self._target_sheet:
+            return
+        self._target_sheet = sheet
+        for entry in self._entries:
+            entry.rows = None
+        self._column_changed(COL_SHEET, COL_ROWS)
+        self._reload()
+
+    def sheet_status(self, path):
+        """文件是否包含所选 Sheet，尚未读取 Sheet 列表或没有选择 Sheet 时返回 None"""
+        index = self._sheet_index
+        if index is None or self._target_sheet is None:
+            return None
+        if path in index.errors:
+            return SHEET_UNREADABLE
+        sheet_names = index.sheet_names.get(path)
+        if sheet_names is None:
+            return None
+        return SHEET_PRESENT if self._target_sheet in sheet_names else SHEET_MISSING
+
+    @property
+    def loading(self):
+        """后台是否还有未完成的读取"""
+        return any(not future.done() for future in self._futures)
+
+    def _reindex(self):
+        self._rows = {entry.order: row for row, entry in enumerate(self._entries)}
+
+    def _column_changed(self, first, last=None):
+        if self._entries:
+            self.dataChanged.emit(self.index(0, first), self.index(len(self._entries) - 1, last or first))
+
+    # ---- 后台读取 ----
+
+    def _reload(self):
+        """取消尚未开始的任务，分批提交全部文件"""
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self._generation += 1
+        if not self._entries:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-metadata")
+
+        generation = self._generation
+        sheet = self._target_sheet
+        entries = sorted(self._entries, key=lambda entry: entry.order)
+        for start in range(0, len(entries), LOAD_BATCH):
+            batch = entries[start:start + LOAD_BATCH]
+            self._futures.append(self._executor.submit(self._load, generation, batch, sheet))
+        self._timer.start()
+
+    def _load(self, generation, entries, sheet):
+        """在后台线程中执行，结果交给界面线程的 _flush 处理"""
+        if generation == self._generation:
+            self._results.put((generation, sheet, _load_metadata(entries, sheet)))
+
+    def _flush(self):
+        """在界面线程中取出已读取的结果，合并为一次 dataChanged"""
+        changed = []
+        while True:
+            try:
+                generation, sheet, results = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue
+            for entry, size, mtime, rows in results:
+                entry.size = size
+                entry.mtime = mtime
+                if sheet == self._target_sheet:
+                    entry.rows = rows
+                row = self._rows.get(entry.order)
+                if row is not None:
+                    changed.append(row)
+
+        if changed:
+            self.dataChanged.emit(self.index(min(changed), COL_SIZE), self.index(max(changed), COL_ROWS))
+        if not self.loading and self._results.empty():
+            self._timer.stop()
+
+    def shutdown(self):
+        """停止后台读取"""
+        self._timer.stop()
+        self._generation += 1
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._futures = []
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量合并模块 - 只提取新增或修改过的文件，其余数据直接从上一次的合并结果中复制
+"""
+
+import os
+import glob
+import json
+
+from column_align import ColumnAligner
+from instrumentation import logger
+from merger import ExcelMerger, SheetStream, split_sheet_titles
+from parse_cache import file_fingerprint
+from row_batch import RowBatch, column_is_numeric
+
+
+MANIFEST_VERSION = 1
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def manifest_path(output_path):
+    """合并结果对应的清单文件路径"""
+    return output_path + MANIFEST_SUFFIX
+
+
+def load_manifest(output_path):
+    """
+    读取合并结果的清单
+
+    Returns:
+        dict: 清单内容，不存在或无法识别时返回 None
+    """
+    try:
+        with open(manifest_path(output_path), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(output_path, manifest):
+    """保存合并结果的清单"""
+    with open(manifest_path(output_path), "w", encoding="utf-8") as f:
+        # 表头中可能有日期等无法直接序列化的值，统一转为字符串
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+
+
+def find_previous_output(directory, target_sheet):
+    """
+    查找目录中最近一次生成的、带清单的合并结果
+
+    文件名模式也会匹配以 "{target_sheet}_" 开头的其他 Sheet 的合并结果（例如 Sheet1_old），
+    因此只接受清单中 target_sheet 相同的结果。
+
+    Returns:
+        str: 合并结果路径，没有时返回 None
+    """
+    pattern = os.path.join(glob.escape(directory), f"合并结果_{glob.escape(target_sheet)}_*.xlsx")
+    # 文件名中的时间戳可以直接按字符串排序
+    for path in sorted(glob.glob(pattern), reverse=True):
+        manifest = load_manifest(path)
+        if manifest is not None and manifest.get("target_sheet") == target_sheet:
+            return path
+    return None
+
+
+def _full_list_progress(progress, files, reused_paths):
+    """
+    把只针对需要提取的文件的进度回调换算为 files 中的位置
+
+    extract_files 只处理需要提取的文件，回调中的 file_index 和 file_count 都相对于这部分文件；
+    换算后 file_index 是该文件在 files 中的位置，file_count 是 files 的总数，复用的文件视为已完成。
+    """
+    if progress is None:
+        return None
+    positions = [i for i, f in enumerate(files) if os.path.abspath(f) not in reused_paths]
+    positions.append(len(files))
+
+    def report(file_index, file_count, rows_read):
+        progress(positions[min(file_index, len(positions) - 1)], len(files), rows_read)
+
+    return report
+
+
+def incremental_merge(files, target_sheet, header_rows_count, all_sheet_names, directory=".",
+                      previous_output=None, workers=1, progress=None, cancel=None, cache=None, fast_xlsx=False,
+                      align_columns=True):
+    """
+    增量合并
+
+    读取上一次合并结果的清单，清单中指纹未变化的文件直接从上一次的结果中按行段复制，
+    只有新增或修改过的文件才重新提取。未修改文件的数据保持原来的顺序在前，
+    新增和修改过的文件按 files 中的顺序追加在后。输出仍是新的带时间戳的合并结果，
+    并同时写出新的清单供下一次增量合并使用。
+
+    清单中保存统一后的表头，新提取的文件按列名对齐到这个表头（与 collect_results 相同），
+    新增的列追加在末尾。上一次合并时的 align_columns 与本次不同时不复用上一次的结果。
+
+    没有可用的上一次结果时等同于完整合并。
+
+    Args:
+        files (list): Excel 文件路径列表
+        target_sheet (str): 要合并的 Sheet 名称
+        header_rows_count (int): 表头行数
+        all_sheet_names (list): 所有 Sheet 名称
+        directory (str): 输出目录
+        previous_output (str): 上一次的合并结果，None 时自动在 directory 中查找
+        workers, progress, cancel, cache, fast_xlsx: 参见 ExcelMerger.extract_files
+        align_columns (bool): 参见 ExcelMerger.collect_results
+
+    Returns:
+        dict: {"output_path", "row_count", "file_order", "reused_files", "extracted_files"}，
+              没有任何有效数据时返回 None
+    """
+    if previous_output is None:
+        previous_output = find_previous_output(directory, target_sheet)
+
+    manifest = load_manifest(previous_output) if previous_output else None
+    if manifest and (manifest["target_sheet"] != target_sheet
+                     or manifest["header_rows_count"] != header_rows_count
+                     or manifest.get("align_columns", False) != align_columns):
+        manifest = None
+
+    fingerprints = {}
+    for file_path in files:
+        try:
+            fingerprints[os.path.abspath(file_path)] = file_fingerprint(file_path)
+        except OSError:
+            pass
+
+    previous_sources = manifest["sources"] if manifest else []
+    reused = [
+        source for source in previous_sources
+        if fingerprints.get(source["path"]) == source["fingerprint"]
+    ]
+    reused_paths = {source["path"] for source in reused}
+    to_extract = [f for f in files if os.path.abspath(f) not in reused_paths]
+
+    if reused:
+        logger.info(f"  {len(reused)} 个文件未修改，从上一次的合并结果中复制: {os.path.basename(previous_output)}")
+
+    header_rows = manifest["header_rows"] if manifest else []
+    aligner = None
+    new_results = []
+    results = ExcelMerger.extract_files(
+        to_extract, target_sheet, header_rows_count, workers,
+        progress=_full_list_progress(progress, files, reused_paths), cancel=cancel, cache=cache, fast_xlsx=fast_xlsx
+    )
+    for result in results:
+        if result.error:
+            logger.error(f"  错误: 无法读取文件 {result.file_name}: {result.error}")
+            continue
+
+        if result.warning:
+            logger.warning(f"  警告: {result.warning}")
+            continue
+
+        if not header_rows and len(result.header_rows) >= header_rows_count:
+            header_rows = result.header_rows
+            logger.info(f"  保存表头行（前 {header_rows_count} 行）")
+
+        if align_columns and header_rows and result.data_rows:
+            if aligner is None:
+                aligner = ColumnAligner(header_rows)
+            mapping = ExcelMerger._plan_alignment(aligner, result)
+            if mapping is not None:
+                result.data_rows = mapping.apply(result.data_rows)
+
+        new_results.append(result)
+        if result.data_rows:
+            logger.info(f"  提取了 {len(result.data_rows)} 行有效数据（共读取 {result.rows_read} 行）")
+
+    if aligner is not None:
+        header_rows = aligner.header_rows
+
+    reused_row_count = sum(source["rows"] for source in reused)
+    new_row_count = sum(len(result.data_rows) for result in new_results)
+    if not header_rows or reused_row_count + new_row_count == 0:
+        return None
+
+    # 第一列是否重新编号：沿用上一次的判断，新增数据也必须都是数字
+    renumber = manifest["renumbered"] if reused else True
+    if renumber:
+        renumber = all(column_is_numeric(RowBatch(result.data_rows).column(0)) for result in new_results)
+
+    sources = []
+    file_order = []
+    for source in reused:
+        sources.append(dict(source))
+        if source["rows"]:
+            file_order.append(os.path.basename(source["path"]))
+    for result in new_results:
+        path = os.path.abspath(result.file_path)
+        sources.append({
+            "path": path,
+            "fingerprint": fingerprints.get(path),
+            "rows": len(result.data_rows),
+        })
+        if result.data_rows:
+            file_order.append(result.file_name)
+
+    def previous_sheet_rows():
+        """依次读取上一次的结果中数据所在的各个 Sheet（超过行数上限时拆分出的 Sheet 也在清单中）"""
+        for title in manifest.get("sheet_titles") or [target_sheet]:
+            stream = SheetStream(previous_output, title, header_rows_count)
+            try:
+                if not stream.open():
+                    raise Exception(f"无法读取上一次的合并结果: {stream.warning}")
+                yield from stream
+            finally:
+                stream.close()
+
+    def previous_rows():
+        """按清单中的行段顺序读取上一次的结果，只保留未修改文件的行"""
+        rows = previous_sheet_rows()
+        try:
+            for source in previous_sources:
+                keep = source["path"] in reused_paths
+                for _ in range(source["rows"]):
+                    row = next(rows, None)
+                    if row is None:
+                        raise Exception("上一次的合并结果与清单中的行数不一致，请重新完整合并")
+                    if keep:
+                        yield row
+        finally:
+            rows.close()
+
+    def merged_rows():
+        counter = 0
+        segments = [result.data_rows for result in new_results]
+        if reused:
+            segments.insert(0, previous_rows())
+        for segment in segments:
+            for row in segment:
+                if renumber and row:
+                    counter += 1
+                    row[0] = counter
+                yield row
+
+    output_path = ExcelMerger.create_output_file(
+        header_rows, merged_rows(), target_sheet, file_order, all_sheet_names, directory, write_only=True
+    )
+    if not output_path:
+        return None
+
+    save_manifest(output_path, {
+        "version": MANIFEST_VERSION,
+        "target_sheet": target_sheet,
+        "header_rows_count": header_rows_count,
+        "header_rows": header_rows,
+        "align_columns": align_columns,
+        "renumbered": renumber,
+        "sheet_titles": split_sheet_titles(target_sheet, len(header_rows), reused_row_count + new_row_count),
+        "sources": sources,
+    })
+
+    return {
+        "output_path": output_path,
+        "row_count": reused_row_count + new_row_count,
+        "file_order": file_order,
+        "reused_files": len(reused),
+        "extracted_files": len(to_extract),
+    }
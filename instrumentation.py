@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志与指标模块
+
+合并引擎的文字日志通过 logging 模块的 "excel_merger" logger 输出，由调用方决定显示位置
+（控制台、GUI 日志框等）；结构化的指标以事件 dict 的形式分发给已注册的监听器，
+例如 JsonLinesTrace 可以把它们写入 JSON Lines 文件用于分析生产环境的性能。
+
+事件类型:
+    file  - 单个文件提取完成: file, seconds, bytes, rows_read, rows_kept, cached, warning, error
+    stage - 一个阶段结束: stage, seconds, peak_rss_mb 以及阶段相关的字段（如 rows、files）
+"""
+
+import sys
+import json
+import time
+import logging
+import contextlib
+
+
+logger = logging.getLogger("excel_merger")
+
+_listeners = []
+
+
+def add_listener(listener):
+    """注册事件监听器，listener(event) 接收一个 dict"""
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    """注销事件监听器"""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+@contextlib.contextmanager
+def listening(listener):
+    """在 with 块内注册监听器"""
+    add_listener(listener)
+    try:
+        yield listener
+    finally:
+        remove_listener(listener)
+
+
+def emit(event, **fields):
+    """分发事件，监听器中的异常不会影响合并"""
+    if not _listeners:
+        return
+    record = {"event": event, "time": round(time.time(), 3)}
+    record.update(fields)
+    for listener in list(_listeners):
+        try:
+            listener(record)
+        except Exception:
+            logger.debug("事件监听器出错", exc_info=True)
+
+
+def _windows_peak_working_set():
+    """Windows 上通过 GetProcessMemoryInfo（ctypes 调用 psapi，无需第三方库）读取峰值工作集（字节）"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32")
+    psapi = ctypes.WinDLL("psapi")
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    psapi.GetProcessMemoryInfo.restype = wintypes.BOOL
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def peak_rss_mb():
+    """进程的峰值内存（MB），无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        if sys.platform != "win32":
+            return None
+        try:
+            peak = _windows_peak_working_set()
+        except (OSError, AttributeError):
+            return None
+        return None if peak is None else round(peak / 1024 / 1024, 1)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 单位为字节
+    if sys.platform == "darwin":
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+@contextlib.contextmanager
+def stage(name, **fields):
+    """
+    记录一个阶段的耗时和内存峰值
+
+    with 块中可以向返回的 dict 添加字段（例如处理的行数），阶段结束时一并发出::
+
+        with stage("extract", files=len(files)) as info:
+            ...
+            info["rows"] = total
+    """
+    info = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        seconds = round(time.perf_counter() - start, 4)
+        logger.debug(f"阶段 {name} 用时 {seconds:.3f}s")
+        emit("stage", stage=name, seconds=seconds, peak_rss_mb=peak_rss_mb(), **info)
+
+
+class JsonLinesTrace:
+    """把事件逐行写入 JSON Lines 文件的监听器"""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, event):
+        self._file.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        add_listener(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        remove_listener(self)
+        self.close()
+        return False
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志控制台 - 有上限、成批刷新的日志框，可按级别过滤，可把完整日志同步写入滚动日志文件
+
+合并数千个文件时每个文件都会产生日志，逐条追加到文本框并滚动会让界面线程忙于重绘，
+文本框中的内容也会无限增长。这里的日志先放入线程安全的队列（任何线程都可以写入，
+不经过 Qt 信号），界面线程每 FLUSH_INTERVAL_MS 毫秒取出一次，一次性追加到
+QPlainTextEdit；文本框设置了 maximumBlockCount，超出的旧行自动丢弃。
+
+日志通过 logging 进入控制台：合并引擎使用 "excel_merger" logger，界面自己的消息使用
+"excel_merger.gui"。引擎的 INFO 及以下记录（每个文件的行数等）按"详细"级别显示，
+避免与界面输出的合并摘要重复；警告和错误按原级别显示。
+"""
+
+import os
+import sys
+import queue
+import logging
+import collections
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QPlainTextEdit
+
+
+# 日志框最多保留的行数
+DEFAULT_MAX_BLOCKS = 5000
+
+# 刷新间隔（毫秒）
+FLUSH_INTERVAL_MS = 100
+
+# 界面自己的日志使用的 logger
+GUI_LOGGER_NAME = "excel_merger.gui"
+
+# 可选的显示级别，按从详细到简略的顺序
+LEVEL_CHOICES = (
+    ("详细", logging.DEBUG),
+    ("信息", logging.INFO),
+    ("警告", logging.WARNING),
+    ("错误", logging.ERROR),
+)
+
+# 日志文件的大小上限和保留的旧文件数
+DEFAULT_LOG_FILE_BYTES = 5 * 1024 * 1024
+DEFAULT_LOG_BACKUPS = 3
+
+
+def default_log_path():
+    """默认的日志文件路径"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "ExcelMerger", "logs", "excel_merger.log")
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "excel_merger", "excel_merger.log")
+
+
+def open_log_file(path=None, max_bytes=DEFAULT_LOG_FILE_BYTES, backup_count=DEFAULT_LOG_BACKUPS):
+    """
+    创建写入滚动日志文件的 handler，记录所有级别
+
+    Args:
+        path (str): 日志文件路径，None 时使用 default_log_path()
+        max_bytes (int): 单个文件的大小上限，超过后改名为 .1、.2 ... 并新建文件
+        backup_count (int): 保留的旧文件数
+
+    Returns:
+        logging.handlers.RotatingFileHandler
+    """
+    # logging.handlers 导入较慢，只在需要写日志文件时导入
+    import logging.handlers
+
+    path = path or default_log_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+    )
+    handler.setLevel(logging.DEBUG)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    return handler
+
+
+class LogConsole(QPlainTextEdit):
+    """
+    有上限、成批刷新的只读日志框
+
+    post() 可以在任意线程调用；显示级别变化时，用最近的记录重新显示。
+    """
+
+    def __init__(self, parent=None, max_blocks=DEFAULT_MAX_BLOCKS, interval_ms=FLUSH_INTERVAL_MS):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_blocks)
+        self.setUndoRedoEnabled(False)
+        self.level = logging.INFO
+        self._pending = queue.SimpleQueue()
+        # 最近的记录 (级别, 文本)，切换显示级别时重新显示
+        self._history = collections.deque(maxlen=max_blocks)
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def post(self, level, text):
+        """加入一条日志，下一次刷新时显示"""
+        self._pending.put((level, text))
+
+    def flush(self):
+        """取出所有待显示的日志，一次性追加"""
+        records = []
+        while True:
+            try:
+                records.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        if not records:
+            return
+        self._history.extend(records)
+        lines = [text for level, text in records if level >= self.level]
+        if lines:
+            self._append(lines)
+
+    def _append(self, lines):
+        scroll_bar = self.verticalScrollBar()
+        # 用户向上翻看时不强制滚动到底部
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 4
+        self.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def set_level(self, level):
+        """设置显示级别，并按新的级别重新显示最近的记录"""
+        if level == self.level:
+            return
+        self.flush()
+        self.level = level
+        self.clear()
+        lines = [text for record_level, text in self._history if record_level >= level]
+        if lines:
+            self._append(lines)
+
+    def clear_log(self):
+        """清空日志框和最近的记录"""
+        self.flush()
+        self._history.clear()
+        self.clear()
+
+
+class ConsoleLogHandler(logging.Handler):
+    """把 logging 记录交给 LogConsole，可以在后台线程中调用"""
+
+    def __init__(self, console, engine_logger="excel_merger"):
+        super().__init__(logging.DEBUG)
+        self.console = console
+        self.engine_logger = engine_logger
+        self.setFormatter(logging.Formatter("%(message)s"))
+
+    def emit(self, record):
+        try:
+            level = record.levelno
+            if record.name == self.engine_logger and level < logging.WARNING:
+                level = logging.DEBUG
+            self.console.post(level, self.format(record))
+        except Exception:
+            self.handleError(record)
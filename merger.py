@@ -1,49 +1,782 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Excel 合并功能模块 - 不使用 pandas，纯 openpyxl 实现
+Excel 合并功能模块 - 不使用 pandas，XLSX 使用 openpyxl，XLS 使用 xlrd
 """
 
 import os
-import glob
+import time
+import itertools
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime
 import openpyxl
 from openpyxl.utils import get_column_letter
 
+from instrumentation import logger, emit, stage
+from output_sinks import DEFAULT_CSV_ENCODING, write_csv, write_parquet
+from row_batch import RowBatch, column_is_numeric
+from row_store import RowStore
+from column_align import ColumnAligner
+from file_scanner import SCAN_WORKERS, scan_files
+from dedup import row_hashes
+from xlsx_fast import FastXlsxReader, local_name, workbook_part
 
-class ExcelMerger:
-    """Excel 文件合并器 - 不依赖 pandas"""
+
+# 自动列宽的上限
+MAX_COLUMN_WIDTH = 50
+
+# 只写模式下列宽需要在写入数据前确定，默认按前 N 行采样估算
+WRITE_ONLY_WIDTH_SAMPLE_ROWS = 1000
+
+# 读取数据时每批处理的行数，每批汇报一次进度并检查是否取消
+PROGRESS_CHUNK_ROWS = 1000
+
+# stream_merge 预读第一列时每批读取的行数，较小的批次使预读在第一个非数字值附近即停止
+RENUMBER_SCAN_BATCH_ROWS = 64
+
+# 单个 Sheet 的最大行数
+EXCEL_MAX_ROWS = 1048576
+
+# 输出格式 -> 扩展名
+OUTPUT_FORMATS = {
+    "xlsx": ".xlsx",
+    "csv": ".csv",
+    "parquet": ".parquet",
+}
+
+# 并发读取 Sheet 列表的线程数
+SHEET_INDEX_WORKERS = 8
+
+
+def _split_sheet_title(sheet_name, part):
+    """拆分出的 Sheet 名称，如 "明细_2"，不超过 Excel 的 31 个字符限制"""
+    suffix = f"_{part}"
+    return sheet_name[:31 - len(suffix)] + suffix
+
+
+def split_sheet_titles(sheet_name, header_rows_count, row_count):
+    """
+    写出 row_count 行数据时，数据所在的各 Sheet 名称（超过 Excel 行数上限时按 _write_sheet 的规则拆分）
     
-    @staticmethod
-    def scan_excel_files(directory="."):
-        """扫描目录下的所有 Excel 文件"""
-        xlsx_files = glob.glob(os.path.join(directory, "*.xlsx"))
-        xls_files = glob.glob(os.path.join(directory, "*.xls"))
+    Returns:
+        list: Sheet 名称，第一个为 sheet_name
+    """
+    max_data_rows = EXCEL_MAX_ROWS - header_rows_count
+    parts = max(1, -(-row_count // max_data_rows))
+    return [sheet_name] + [_split_sheet_title(sheet_name, part) for part in range(2, parts + 1)]
+
+
+class OpenpyxlReader:
+    """XLSX / XLSM 读取后端（openpyxl 只读模式）"""
+    
+    def __init__(self, file_path):
+        self._wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    
+    @property
+    def sheet_names(self):
+        return self._wb.sheetnames
+    
+    def iter_rows(self, sheet_name):
+        """逐行产出单元格值元组"""
+        ws = self._wb[sheet_name]
+        # 部分软件导出的文件把尺寸错误地写成 "A1"，此时按实际内容读取
+        if ws.max_row == 1 and ws.max_column == 1:
+            ws.reset_dimensions()
+        return ws.iter_rows(values_only=True)
+    
+    def close(self):
+        self._wb.close()
+
+
+class XlrdReader:
+    """XLS（BIFF）读取后端，依赖 xlrd"""
+    
+    def __init__(self, file_path):
+        try:
+            import xlrd
+        except ImportError:
+            raise Exception("读取 .xls 文件需要安装 xlrd（pip install xlrd）")
+        self._xlrd = xlrd
+        # on_demand 模式下只在访问时才解析对应的 Sheet
+        self._book = xlrd.open_workbook(file_path, on_demand=True)
+    
+    @property
+    def sheet_names(self):
+        return self._book.sheet_names()
+    
+    def iter_rows(self, sheet_name):
+        """逐行产出单元格值元组，类型与 openpyxl 的结果保持一致"""
+        xlrd = self._xlrd
+        datemode = self._book.datemode
+        sheet = self._book.sheet_by_name(sheet_name)
+        
+        for row_idx in range(sheet.nrows):
+            types = sheet.row_types(row_idx)
+            values = sheet.row_values(row_idx)
+            row = []
+            for ctype, value in zip(types, values):
+                if ctype == xlrd.XL_CELL_NUMBER:
+                    # BIFF 中数字都以浮点存储，整数值还原为 int
+                    if value.is_integer():
+                        value = int(value)
+                elif ctype == xlrd.XL_CELL_DATE:
+                    try:
+                        value = xlrd.xldate.xldate_as_datetime(value, datemode)
+                    except xlrd.xldate.XLDateError:
+                        pass
+                elif ctype == xlrd.XL_CELL_BOOLEAN:
+                    value = bool(value)
+                elif ctype == xlrd.XL_CELL_ERROR:
+                    value = xlrd.error_text_from_code.get(value)
+                elif ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                    value = None
+                row.append(value)
+            yield tuple(row)
+    
+    def close(self):
+        self._book.release_resources()
+
+
+# 文件签名 -> 读取后端，按文件头而不是扩展名选择
+READER_BACKENDS = [
+    (b"PK\x03\x04", OpenpyxlReader),
+    (b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1", XlrdReader),
+]
+
+
+def register_reader(signature, reader_class):
+    """
+    注册读取后端
+    
+    Args:
+        signature (bytes): 文件开头的魔数
+        reader_class: 接受文件路径构造，提供 sheet_names、iter_rows(sheet_name)、close() 的类
+    """
+    READER_BACKENDS.insert(0, (signature, reader_class))
+
+
+def open_reader(file_path, fast_xlsx=False):
+    """
+    根据文件签名选择读取后端并打开文件
+    
+    fast_xlsx 为 True 时 XLSX 文件改用 FastXlsxReader 直接解析工作表 XML，
+    无法处理的内容自动交给 OpenpyxlReader。
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(8)
+    
+    if fast_xlsx and head.startswith(b"PK\x03\x04"):
+        try:
+            return FastXlsxReader(file_path, fallback=OpenpyxlReader)
+        except Exception as e:
+            logger.debug(f"快速读取无法打开 {os.path.basename(file_path)}，改用 openpyxl: {e}")
+    
+    for signature, reader_class in READER_BACKENDS:
+        if head.startswith(signature):
+            return reader_class(file_path)
+    
+    raise Exception("不支持的文件格式")
+
+
+class SheetStream:
+    """
+    单个 Sheet 的流式读取器
+    
+    通过 open_reader 选择的读取后端打开工作簿，读取时跳过表头行，逐行产出非空数据行，
+    不在内存中保留整个工作簿。用法：
+    
+        stream = SheetStream(path, "Sheet1", 1)
+        if stream.open():
+            for row in stream:
+                ...
+        stream.close()
+    
+    传入已打开的 reader 时，同一个工作簿中的多个 Sheet 可以依次读取而不必重复打开文件，
+    此时 close() 不会关闭 reader。
+    """
+    
+    def __init__(self, file_path, target_sheet, header_rows_count, reader=None, fast_xlsx=False):
+        self.file_path = file_path
+        self.target_sheet = target_sheet
+        self.header_rows_count = header_rows_count
+        self.header_rows = []
+        self.rows_read = 0
+        self.rows_kept = 0
+        self.warning = None
+        self._reader = reader
+        self._owns_reader = reader is None
+        self._fast_xlsx = fast_xlsx
+        self._rows = None
+    
+    def open(self):
+        """
+        打开文件并读取表头行
+        
+        Returns:
+            bool: Sheet 存在且不为空时返回 True，否则原因记录在 warning 中
+        """
+        if self._reader is None:
+            self._reader = open_reader(self.file_path, self._fast_xlsx)
         
-        all_files = xlsx_files + xls_files
+        if self.target_sheet not in self._reader.sheet_names:
+            self.warning = f"Sheet '{self.target_sheet}' 在文件 {os.path.basename(self.file_path)} 中不存在"
+            self.close()
+            return False
         
-        # 过滤掉包含"合并结果"的文件
-        all_files = [f for f in all_files if "合并结果" not in os.path.basename(f)]
+        self._rows = self._reader.iter_rows(self.target_sheet)
+        for row in self._rows:
+            self.header_rows.append(list(row) if row else [])
+            if len(self.header_rows) >= self.header_rows_count:
+                break
         
-        if not all_files:
+        if not self.header_rows:
+            self.warning = f"Sheet '{self.target_sheet}' 为空"
+            self.close()
+            return False
+        
+        return True
+    
+    def iter_batches(self, batch_rows=PROGRESS_CHUNK_ROWS):
+        """每次读取 batch_rows 行，产出去掉空行后的 RowBatch（行为 list）"""
+        if self._rows is None:
+            return
+        while True:
+            chunk = list(itertools.islice(self._rows, batch_rows))
+            if not chunk:
+                return
+            self.rows_read += len(chunk)
+            batch = RowBatch(chunk).drop_empty()
+            self.rows_kept += len(batch)
+            if len(batch):
+                yield batch
+    
+    def __iter__(self):
+        """逐行产出过滤后的数据行（list）"""
+        for batch in self.iter_batches():
+            yield from batch.rows
+    
+    def close(self):
+        """关闭工作簿，释放文件句柄"""
+        self._rows = None
+        if self._reader is not None:
+            if self._owns_reader:
+                self._reader.close()
+            self._reader = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class MergeCancelled(Exception):
+    """合并被用户取消"""
+
+
+class FileExtractResult:
+    """单个文件的提取结果"""
+    
+    def __init__(self, file_path, sheet=None):
+        self.file_path = file_path
+        self.sheet = sheet
+        self.header_rows = []
+        self.data_rows = []
+        self.rows_read = 0
+        self.warning = None
+        self.error = None
+        # 指标：解析耗时、文件大小、是否来自缓存
+        self.seconds = 0.0
+        self.bytes_read = 0
+        self.cached = False
+        # 去重时去掉的行数
+        self.duplicate_rows = 0
+    
+    @property
+    def file_name(self):
+        return os.path.basename(self.file_path)
+    
+    def to_cache_entry(self):
+        """转换为可缓存的 dict"""
+        return {
+            "header_rows": self.header_rows,
+            "data_rows": self.data_rows,
+            "rows_read": self.rows_read,
+            "warning": self.warning,
+        }
+    
+    @classmethod
+    def from_cache_entry(cls, file_path, entry, sheet=None):
+        """从缓存的 dict 恢复"""
+        result = cls(file_path, sheet)
+        result.header_rows = entry["header_rows"]
+        result.data_rows = entry["data_rows"]
+        result.rows_read = entry["rows_read"]
+        result.warning = entry["warning"]
+        result.cached = True
+        return result
+    
+    def emit_metrics(self):
+        """发出单个文件的指标事件"""
+        emit(
+            "file",
+            file=self.file_path,
+            sheet=self.sheet,
+            seconds=round(self.seconds, 4),
+            bytes=self.bytes_read,
+            rows_read=self.rows_read,
+            rows_kept=len(self.data_rows),
+            cached=self.cached,
+            warning=self.warning,
+            error=self.error,
+        )
+
+
+def _extract_file_sheets(file_path, target_sheets, header_rows_count, on_chunk=None, fast_xlsx=False):
+    """
+    打开文件一次，依次提取多个 Sheet 的表头和有效数据行
+    
+    定义在模块级别，以便在子进程中执行（需要可被 pickle）。
+    异常不会抛出，而是记录在结果的 error 中（MergeCancelled 除外）：文件无法打开时
+    所有 Sheet 的结果都带有 error，单个 Sheet 读取失败只影响该 Sheet。
+    
+    on_chunk(rows_read) 每读取 PROGRESS_CHUNK_ROWS 行调用一次，rows_read 为该文件累计读取的行数，
+    可以抛出 MergeCancelled 中止读取。fast_xlsx 参见 open_reader。
+    
+    Returns:
+        list: 与 target_sheets 顺序一致的 FileExtractResult 列表
+    """
+    results = [FileExtractResult(file_path, sheet) for sheet in target_sheets]
+    reader = None
+    try:
+        bytes_read = os.path.getsize(file_path)
+        start = time.perf_counter()
+        reader = open_reader(file_path, fast_xlsx)
+        open_seconds = time.perf_counter() - start
+    except Exception as e:
+        for result in results:
+            result.error = str(e)
+        return results
+    
+    rows_before = 0
+    try:
+        for result in results:
+            result.bytes_read = bytes_read
+            stream = SheetStream(file_path, result.sheet, header_rows_count, reader=reader)
+            start = time.perf_counter()
+            try:
+                if stream.open():
+                    result.header_rows = stream.header_rows
+                    for batch in stream.iter_batches():
+                        result.data_rows.extend(batch.rows)
+                        if on_chunk is not None:
+                            on_chunk(rows_before + stream.rows_read)
+                    result.rows_read = stream.rows_read
+                else:
+                    result.warning = stream.warning
+            except MergeCancelled:
+                raise
+            except Exception as e:
+                result.error = str(e)
+            finally:
+                stream.close()
+                result.seconds = time.perf_counter() - start
+            rows_before += result.rows_read
+    finally:
+        reader.close()
+    # 打开文件的耗时计入第一个 Sheet
+    if results:
+        results[0].seconds += open_seconds
+    return results
+
+
+def _extract_file(file_path, target_sheet, header_rows_count, on_chunk=None, fast_xlsx=False):
+    """提取单个文件中一个 Sheet 的表头和有效数据行，参见 _extract_file_sheets"""
+    return _extract_file_sheets(file_path, [target_sheet], header_rows_count, on_chunk, fast_xlsx)[0]
+
+
+def _check_cancelled(cancel):
+    """cancel 为 threading.Event 之类带 is_set() 的对象"""
+    if cancel is not None and cancel.is_set():
+        raise MergeCancelled()
+
+def read_sheet_names_fast(file_path):
+    """
+    直接从 XLSX 压缩包的 workbook.xml 中读取 Sheet 名称，不经过 openpyxl
+    
+    Raises:
+        zipfile.BadZipFile: 不是 XLSX 文件（例如 .xls）
+    """
+    sheet_names = []
+    with zipfile.ZipFile(file_path) as zf:
+        with zf.open(workbook_part(zf)) as f:
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                name = local_name(elem.tag)
+                if event == "start" and name == "sheet":
+                    sheet_names.append(elem.get("name"))
+                elif event == "end" and name == "sheets":
+                    # <sheets> 之后的内容不需要解析
+                    break
+    return sheet_names
+
+
+class SheetIndex:
+    """多个文件的 Sheet 名称索引"""
+    
+    def __init__(self, files):
+        self.files = list(files)
+        self.sheet_names = {}  # 文件路径 -> Sheet 名称列表
+        self.errors = {}       # 文件路径 -> 错误信息
+    
+    @property
+    def union(self):
+        """所有文件中出现过的 Sheet，按首次出现的顺序排列"""
+        seen = {}
+        for file_path in self.files:
+            for name in self.sheet_names.get(file_path, []):
+                seen.setdefault(name, None)
+        return list(seen)
+    
+    @property
+    def intersection(self):
+        """所有可读文件中都存在的 Sheet，按第一个文件中的顺序排列"""
+        readable = [self.sheet_names[f] for f in self.files if f in self.sheet_names]
+        if not readable:
             return []
+        common = set(readable[0]).intersection(*readable[1:])
+        return [name for name in readable[0] if name in common]
+    
+    def files_missing(self, sheet_name):
+        """不包含指定 Sheet 的可读文件"""
+        return [
+            f for f in self.files
+            if f in self.sheet_names and sheet_name not in self.sheet_names[f]
+        ]
+
+
+class ColumnWidthEstimator:
+    """
+    列宽估算器
+    
+    在写入行的同时累计每列的最大显示长度，避免写入后再遍历整张表。
+    可以只统计前 sample_rows 行以进一步降低开销。
+    """
+    
+    def __init__(self, sample_rows=None, max_width=MAX_COLUMN_WIDTH):
+        self.sample_rows = sample_rows
+        self.max_width = max_width
+        self.rows_seen = 0
+        self._max_lengths = []
+        # 达到上限后不再需要测量的长度
+        self._cap = max_width - 2
+    
+    @property
+    def done(self):
+        """采样行数已满，后续行无需再统计"""
+        return self.sample_rows is not None and self.rows_seen >= self.sample_rows
+    
+    def observe(self, row):
+        """统计一行数据"""
+        if self.done:
+            return
+        self.rows_seen += 1
         
-        # 按文件修改时间排序
-        return sorted(all_files, key=lambda x: os.path.getmtime(x))
+        lengths = self._max_lengths
+        if len(row) > len(lengths):
+            lengths.extend([0] * (len(row) - len(lengths)))
+        
+        cap = self._cap
+        for idx, value in enumerate(row):
+            if not value or lengths[idx] >= cap:
+                continue
+            cell_len = len(str(value))
+            if cell_len > lengths[idx]:
+                lengths[idx] = cell_len
+    
+    def widths(self):
+        """
+        Returns:
+            dict: {列字母: 列宽}
+        """
+        return {
+            get_column_letter(col_idx): min(max_length + 2, self.max_width)
+            for col_idx, max_length in enumerate(self._max_lengths, 1)
+        }
+    
+    def apply(self, ws):
+        """把估算的列宽写入工作表"""
+        for col_letter, width in self.widths().items():
+            ws.column_dimensions[col_letter].width = width
+
+
+class ExcelMerger:
+    """Excel 文件合并器 - 不依赖 pandas"""
+    
+    @staticmethod
+    def scan_excel_files(directory=".", recursive=False, include=None, exclude=None, sort_by="mtime",
+                         workers=SCAN_WORKERS):
+        """扫描目录下的所有 Excel 文件，返回路径列表（默认按修改时间排序），参数见 scan_excel_records"""
+        records = ExcelMerger.scan_excel_records(directory, recursive, include, exclude, sort_by, workers)
+        return [record.path for record in records]
+    
+    @staticmethod
+    def scan_excel_records(directory=".", recursive=False, include=None, exclude=None, sort_by="mtime",
+                           workers=SCAN_WORKERS):
+        """
+        扫描目录下的所有 Excel 文件
+        
+        Args:
+            directory (str): 要扫描的目录
+            recursive (bool): 是否扫描子目录
+            include (list): 文件的 glob 模式，默认为 *.xlsx 和 *.xls；含 "/" 的模式匹配相对路径
+            exclude (list): 排除的 glob 模式，匹配到的子目录整个跳过
+            sort_by (str): "mtime"、"name"、"path" 或 "size"
+            workers (int): 递归扫描时的线程数
+            
+        Returns:
+            list: FileRecord 列表（path、relpath、size、mtime_ns）
+        """
+        with stage("scan", recursive=recursive) as info:
+            records = scan_files(directory, recursive, include, exclude, sort_by, workers=workers)
+            info["files"] = len(records)
+            info["bytes"] = sum(record.size for record in records)
+        return records
     
     @staticmethod
     def get_sheet_names(file_path):
         """获取 Excel 文件的 Sheet 名称列表"""
         try:
-            wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
-            sheet_names = wb.sheetnames
-            wb.close()
-            return sheet_names
+            return read_sheet_names_fast(file_path)
+        except Exception:
+            pass
+        
+        # 不是 XLSX 或无法直接解析时交给读取后端
+        try:
+            reader = open_reader(file_path)
+            try:
+                return list(reader.sheet_names)
+            finally:
+                reader.close()
         except Exception as e:
             raise Exception(f"无法读取文件 {os.path.basename(file_path)}: {e}")
     
     @staticmethod
-    def merge_sheets(files, target_sheet, header_rows_count):
+    def build_sheet_index(files, workers=SHEET_INDEX_WORKERS):
+        """
+        并发读取所有文件的 Sheet 名称
+        
+        Args:
+            files (list): Excel 文件路径列表
+            workers (int): 线程数
+            
+        Returns:
+            SheetIndex: 包含每个文件的 Sheet 列表、并集、交集和读取失败的文件
+        """
+        index = SheetIndex(files)
+        
+        def read(file_path):
+            try:
+                return file_path, ExcelMerger.get_sheet_names(file_path), None
+            except Exception as e:
+                return file_path, None, str(e)
+        
+        with stage("sheet_index", files=len(index.files)), \
+                ThreadPoolExecutor(max_workers=max(1, min(workers, len(index.files)))) as executor:
+            for file_path, sheet_names, error in executor.map(read, index.files):
+                if error is None:
+                    index.sheet_names[file_path] = sheet_names
+                else:
+                    index.errors[file_path] = error
+        
+        return index
+    
+    @staticmethod
+    def extract_files(files, target_sheet, header_rows_count, workers=1, progress=None, cancel=None, cache=None,
+                      fast_xlsx=False):
+        """
+        逐个提取文件的表头和有效数据行
+        
+        Args:
+            files (list): Excel 文件路径列表
+            target_sheet (str): 要合并的 Sheet 名称
+            header_rows_count (int): 表头行数
+            workers (int): 并行解析的进程数，1 表示在当前进程中顺序处理，
+                           None 表示使用全部 CPU 核心
+            progress (callable): 进度回调 progress(file_index, file_count, rows_read)。
+                                 顺序模式下在每个文件开始时和每读取一批行时调用，
+                                 并行模式下在每个文件完成时调用
+            cancel (threading.Event): 置位后抛出 MergeCancelled。顺序模式下在文件中途即可停止，
+                                      并行模式下等待正在解析的文件结束
+            cache (ParseCache): 解析结果缓存，未修改的文件直接从缓存加载
+            fast_xlsx (bool): XLSX 文件使用 FastXlsxReader 读取，参见 open_reader
+            
+        Returns:
+            list: 与 files 顺序一致的 FileExtractResult 列表
+        """
+        return list(ExcelMerger.iter_extract_files(
+            files, target_sheet, header_rows_count, workers, progress, cancel, cache, fast_xlsx
+        ))
+    
+    @staticmethod
+    def iter_extract_files(files, target_sheet, header_rows_count, workers=1, progress=None, cancel=None, cache=None,
+                           fast_xlsx=False):
+        """
+        与 extract_files 相同，但按文件顺序逐个产出 FileExtractResult
+        
+        每个文件提取完成（或从缓存加载）后立即产出，调用方可以马上取走并释放它的数据行，
+        不必等所有文件的数据都在内存中。参数参见 extract_files。
+        """
+        for found in ExcelMerger.iter_extract_sheets(
+            files, [target_sheet], header_rows_count, workers, progress, cancel, cache, fast_xlsx
+        ):
+            yield found[target_sheet]
+    
+    @staticmethod
+    def extract_sheets(files, target_sheets, header_rows_count, workers=1, progress=None, cancel=None, cache=None,
+                       fast_xlsx=False):
+        """
+        逐个提取文件中多个 Sheet 的表头和有效数据行，每个文件只打开和解析一次
+        
+        Args:
+            files (list): Excel 文件路径列表
+            target_sheets (list): 要合并的 Sheet 名称列表
+            header_rows_count (int): 表头行数，所有 Sheet 相同
+            workers, progress, cancel, cache, fast_xlsx: 参见 extract_files。缓存按文件和 Sheet 分别保存，
+                                                         只有缓存中缺少的 Sheet 才会重新解析
+            
+        Returns:
+            dict: Sheet 名称 -> 与 files 顺序一致的 FileExtractResult 列表
+        """
+        target_sheets = list(target_sheets)
+        results = list(ExcelMerger.iter_extract_sheets(
+            files, target_sheets, header_rows_count, workers, progress, cancel, cache, fast_xlsx
+        ))
+        return {sheet: [found[sheet] for found in results] for sheet in target_sheets}
+    
+    @staticmethod
+    def iter_extract_sheets(files, target_sheets, header_rows_count, workers=1, progress=None, cancel=None,
+                            cache=None, fast_xlsx=False):
+        """
+        与 extract_sheets 相同，但按文件顺序逐个产出 {Sheet 名称: FileExtractResult}
+        
+        缓存命中的文件在轮到它时才加载，每个文件的结果产出后即可由调用方释放。参数参见 extract_sheets。
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        target_sheets = list(target_sheets)
+        total = len(files)
+        
+        with stage("extract", files=total, sheets=len(target_sheets)) as info:
+            info.update(rows_read=0, rows_kept=0, bytes=0, cache_hits=0)
+            
+            # 只检查缓存条目是否存在，内容在文件轮到时才加载
+            if cache is not None:
+                missing = [
+                    [sheet for sheet in target_sheets if not cache.contains(file_path, sheet, header_rows_count)]
+                    for file_path in files
+                ]
+            else:
+                missing = [list(target_sheets) for _ in files]
+            pending = [index for index in range(total) if missing[index]]
+            
+            def load_cached(index, found):
+                """从缓存加载文件的结果，返回在此期间被淘汰、需要重新解析的 Sheet"""
+                lost = []
+                for sheet in target_sheets:
+                    if sheet in missing[index]:
+                        continue
+                    entry = cache.get(files[index], sheet, header_rows_count)
+                    if entry is None:
+                        lost.append(sheet)
+                        continue
+                    result = FileExtractResult.from_cache_entry(files[index], entry, sheet)
+                    found[sheet] = result
+                    result.emit_metrics()
+                return lost
+            
+            def store(index, found, file_results):
+                for result in file_results:
+                    found[result.sheet] = result
+                    result.emit_metrics()
+                    if cache is not None and result.error is None:
+                        cache.put(files[index], result.sheet, header_rows_count, result.to_cache_entry())
+            
+            def finish(found):
+                """按 Sheet 名称的顺序整理结果并累计指标"""
+                found = {sheet: found[sheet] for sheet in target_sheets}
+                info["rows_read"] += sum(r.rows_read for r in found.values())
+                info["rows_kept"] += sum(len(r.data_rows) for r in found.values())
+                info["bytes"] += max((r.bytes_read for r in found.values()), default=0)
+                info["cache_hits"] += sum(1 for r in found.values() if r.cached)
+                return found
+            
+            workers = min(workers, len(pending))
+            
+            if workers <= 1:
+                for index, file_path in enumerate(files):
+                    _check_cancelled(cancel)
+                    if progress:
+                        progress(index, total, 0)
+                    found = {}
+                    sheets = missing[index]
+                    if cache is not None:
+                        sheets = sheets + load_cached(index, found)
+                    
+                    if sheets:
+                        on_chunk = None
+                        if progress or cancel is not None:
+                            def on_chunk(rows_read, index=index):
+                                _check_cancelled(cancel)
+                                if progress:
+                                    progress(index, total, rows_read)
+                        
+                        store(index, found, _extract_file_sheets(
+                            file_path, sheets, header_rows_count, on_chunk, fast_xlsx
+                        ))
+                    yield finish(found)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        index: executor.submit(
+                            _extract_file_sheets, files[index], missing[index], header_rows_count, None, fast_xlsx
+                        )
+                        for index in pending
+                    }
+                    try:
+                        # 按文件顺序收集结果，保证 file_order 和重新编号是确定的
+                        for index in range(total):
+                            found = {}
+                            lost = load_cached(index, found) if cache is not None else []
+                            future = futures.get(index)
+                            while future is not None:
+                                _check_cancelled(cancel)
+                                try:
+                                    store(index, found, future.result(timeout=0.2))
+                                    break
+                                except FuturesTimeoutError:
+                                    continue
+                            if lost:
+                                store(index, found, _extract_file_sheets(
+                                    files[index], lost, header_rows_count, None, fast_xlsx
+                                ))
+                            found = finish(found)
+                            if progress:
+                                progress(index + 1, total, sum(r.rows_read for r in found.values()))
+                            yield found
+                    except MergeCancelled:
+                        for future in futures.values():
+                            future.cancel()
+                        raise
+        
+        if progress:
+            progress(total, total, 0)
+    
+    @staticmethod
+    def merge_sheets(files, target_sheet, header_rows_count, workers=1, progress=None, cancel=None, cache=None,
+                     spill_rows=None, align_columns=True, dedup=None, fast_xlsx=False):
         """
         合并多个 Excel 文件的指定 Sheet
         
@@ -51,158 +784,577 @@ class ExcelMerger:
             files (list): Excel 文件路径列表
             target_sheet (str): 要合并的 Sheet 名称
             header_rows_count (int): 表头行数
+            workers (int): 并行解析的进程数，参见 extract_files
+            progress (callable): 进度回调，参见 extract_files
+            cancel (threading.Event): 取消标志，参见 extract_files
+            cache (ParseCache): 解析结果缓存，参见 extract_files
+            spill_rows (int): 参见 collect_results
+            align_columns (bool): 参见 collect_results
+            dedup (RowDeduplicator): 参见 collect_results
+            fast_xlsx (bool): 参见 extract_files
             
         Returns:
             tuple: (header_rows, data_rows, file_order) 或 (None, None, None) 如果失败
         """
+        # 每个文件提取完成后立即编码进 RowStore 并释放逐行的 list，不会同时保留所有文件的数据
+        results = ExcelMerger.iter_extract_files(
+            files, target_sheet, header_rows_count, workers, progress=progress, cancel=cancel, cache=cache,
+            fast_xlsx=fast_xlsx
+        )
+        return ExcelMerger.collect_results(results, header_rows_count, spill_rows, align_columns, dedup)
+    
+    @staticmethod
+    def merge_all_sheets(files, target_sheets, header_rows_count, workers=1, progress=None, cancel=None, cache=None,
+                         spill_rows=None, align_columns=True, dedup=None, fast_xlsx=False):
+        """
+        一次合并多个 Sheet，每个文件只打开和解析一次
+        
+        Args:
+            files (list): Excel 文件路径列表
+            target_sheets (list): 要合并的 Sheet 名称列表，例如 SheetIndex.union
+            header_rows_count (int): 表头行数，所有 Sheet 相同
+            workers, progress, cancel, cache, spill_rows, align_columns, dedup, fast_xlsx: 参见 merge_sheets
+            
+        Returns:
+            dict: Sheet 名称 -> (header_rows, data_rows, file_order)，按 target_sheets 的顺序，
+                  没有有效数据的 Sheet 为 (None, None, None)
+        """
+        per_sheet = ExcelMerger.extract_sheets(
+            files, target_sheets, header_rows_count, workers, progress=progress, cancel=cancel, cache=cache,
+            fast_xlsx=fast_xlsx
+        )
+        merged = {}
+        for sheet_name, results in per_sheet.items():
+            logger.info(f"\nSheet: {sheet_name}")
+            merged[sheet_name] = ExcelMerger.collect_results(
+                results, header_rows_count, spill_rows, align_columns, dedup
+            )
+        return merged
+    
+    @staticmethod
+    def save_merged_sheets(merged, all_sheet_names, directory=".", output_format="xlsx", encoding=DEFAULT_CSV_ENCODING):
+        """
+        保存 merge_all_sheets 的结果
+        
+        XLSX 输出为一个文件，all_sheet_names 中每个有数据的 Sheet 都写入合并数据；
+        CSV 和 Parquet 每个有数据的 Sheet 各输出一个文件。
+        
+        Returns:
+            list: 输出文件路径，保存失败的文件不包含在内
+        """
+        with_data = {name: value for name, value in merged.items() if value[1] is not None}
+        if not with_data:
+            return []
+        
+        if output_format != "xlsx":
+            paths = []
+            for sheet_name, (header_rows, data_rows, file_order) in with_data.items():
+                path = ExcelMerger.create_output_file(
+                    header_rows, data_rows, sheet_name, file_order, all_sheet_names, directory,
+                    output_format=output_format, encoding=encoding
+                )
+                if path:
+                    paths.append(path)
+            return paths
+        
+        target_sheet, (header_rows, data_rows, _) = next(iter(with_data.items()))
+        # 所有 Sheet 用到的文件，按首次出现的顺序
+        file_order = list(dict.fromkeys(name for _, _, order in with_data.values() for name in order))
+        sheet_data = {
+            name: (value[0], value[1]) for name, value in with_data.items() if name != target_sheet
+        }
+        path = ExcelMerger.create_output_file(
+            header_rows, data_rows, target_sheet, file_order, all_sheet_names, directory, sheet_data=sheet_data
+        )
+        return [path] if path else []
+    
+    @staticmethod
+    def collect_results(results, header_rows_count, spill_rows=None, align_columns=True, dedup=None):
+        """
+        汇总 extract_files 的结果：取第一个完整的表头，按顺序拼接数据行，并重新编号第一列
+        
+        数据行按块、按列编码保存在 RowStore 中（可迭代、支持 len()），各结果中逐行的 list 随之释放。
+        results 可以是 iter_extract_files 返回的迭代器，此时每个文件提取完成后立即编码，
+        峰值内存中只有正在处理的文件的 list（去重时仍需先看过所有文件）。
+        
+        Args:
+            results (iterable): 按合并顺序的 FileExtractResult
+            header_rows_count (int): 表头行数
+            spill_rows (int): 内存中最多保留的数据行数，超过的部分写入临时文件，None 表示全部保留在内存中
+            align_columns (bool): 按最后一行表头的列名把各文件的列对齐到第一个文件的顺序，
+                                  其他文件新增的列追加在末尾；False 时按列位置直接拼接
+            dedup (RowDeduplicator): 去除重复行，None 表示不去重。键列按统一后的表头解析，
+                                     各文件去掉的行数记录在 result.duplicate_rows 中
+            
+        Returns:
+            tuple: (header_rows, data_rows, file_order) 或 (None, None, None) 如果没有有效数据。
+                   data_rows 用完后可以调用 close() 立即删除临时文件
+        """
+        with stage("collect") as info:
+            info["files"] = 0
+            
+            def counted():
+                for result in results:
+                    info["files"] += 1
+                    yield result
+            
+            header_rows, data_rows, file_order = ExcelMerger._collect_results(
+                counted(), header_rows_count, spill_rows, align_columns, dedup
+            )
+            info["rows"] = len(data_rows) if data_rows else 0
+        return header_rows, data_rows, file_order
+    
+    @staticmethod
+    def _collect_results(results, header_rows_count, spill_rows, align_columns, dedup):
         header_rows = []
-        all_data_rows = []
+        all_data_rows = RowStore(max_memory_rows=spill_rows)
         file_order = []
+        aligner = None
         
-        for file_path in files:
-            try:
-                wb = openpyxl.load_workbook(file_path, data_only=True)
-                
-                if target_sheet not in wb.sheetnames:
-                    print(f"  警告: Sheet '{target_sheet}' 在文件 {os.path.basename(file_path)} 中不存在")
+        def accepted_results():
+            """跳过出错的文件、保存表头，按合并顺序产出 (result, 列映射)"""
+            nonlocal header_rows, aligner
+            for result in results:
+                if result.error:
+                    logger.error(f"  错误: 无法读取文件 {result.file_name}: {result.error}")
                     continue
                 
-                ws = wb[target_sheet]
-                
-                # 读取所有行
-                all_rows = []
-                for row in ws.iter_rows(values_only=True):
-                    all_rows.append(list(row) if row else [])
-                
-                if not all_rows:
-                    print(f"  警告: Sheet '{target_sheet}' 为空")
-                    wb.close()
+                if result.warning:
+                    logger.warning(f"  警告: {result.warning}")
                     continue
                 
                 # 保存表头行
-                if not header_rows and len(all_rows) >= header_rows_count:
-                    header_rows = all_rows[:header_rows_count]
-                    print(f"  保存表头行（前 {header_rows_count} 行）")
-                
-                # 提取数据行
-                if len(all_rows) > header_rows_count:
-                    data_rows = all_rows[header_rows_count:]
-                    
-                    # 过滤掉完全空的行（所有单元格都是None或空字符串）
-                    filtered_data_rows = []
-                    for row in data_rows:
-                        # 检查该行是否有至少一个非空值
-                        has_data = False
-                        for cell in row:
-                            if cell is not None and str(cell).strip() != '':
-                                has_data = True
-                                break
-                        if has_data:
-                            filtered_data_rows.append(row)
-                    
-                    if filtered_data_rows:
-                        all_data_rows.extend(filtered_data_rows)
-                        file_order.append(os.path.basename(file_path))
-                        print(f"  提取了 {len(filtered_data_rows)} 行有效数据（共读取 {len(data_rows)} 行）")
+                if not header_rows and len(result.header_rows) >= header_rows_count:
+                    header_rows = result.header_rows
+                    logger.info(f"  保存表头行（前 {header_rows_count} 行）")
                 
-                wb.close()
-                
-            except Exception as e:
-                print(f"  错误: 无法读取文件 {os.path.basename(file_path)}: {e}")
-                continue
+                if result.data_rows:
+                    mapping = None
+                    if align_columns and header_rows:
+                        if aligner is None:
+                            aligner = ColumnAligner(header_rows)
+                        mapping = ExcelMerger._plan_alignment(aligner, result)
+                    yield result, mapping
+        
+        accepted = accepted_results()
+        masks = None
+        if dedup is not None:
+            # 去重需要先看过所有文件（保留最后一次出现时尤其如此），只计算哈希，不复制数据行
+            accepted = list(accepted)
+            if accepted and header_rows:
+                masks = ExcelMerger._dedup_masks(dedup, accepted, aligner.header_rows if aligner else header_rows)
+        
+        for idx, (result, mapping) in enumerate(accepted):
+            data_rows = result.data_rows
+            if mapping is not None:
+                data_rows = mapping.apply(data_rows)
+            if masks is not None:
+                result.duplicate_rows = len(masks[idx]) - sum(masks[idx])
+                if result.duplicate_rows:
+                    data_rows = list(itertools.compress(data_rows, masks[idx]))
+            all_data_rows.extend(data_rows)
+            all_data_rows.flush()
+            file_order.append(result.file_name)
+            logger.info(f"  提取了 {len(result.data_rows)} 行有效数据（共读取 {result.rows_read} 行）")
+            if result.duplicate_rows:
+                logger.info(f"  {result.file_name} 中有 {result.duplicate_rows} 行重复数据，已去除")
+            # 已编码进紧凑存储，释放逐行的 list（在取下一个文件之前，以免与其同时留在内存中）
+            result.data_rows = []
+            data_rows = None
         
         if not all_data_rows or not header_rows:
             return None, None, None
         
+        if aligner is not None:
+            header_rows = aligner.header_rows
+        
         # 重新编号第一列（如果是数字列）
-        if all_data_rows:
-            first_col_data = [row[0] if row else None for row in all_data_rows if row]
-            # 检查第一列是否为数字
-            is_numeric = all(
-                isinstance(val, (int, float)) or 
-                (isinstance(val, str) and val.isdigit())
-                for val in first_col_data if val is not None
+        all_data_rows.renumber_first_column()
+        
+        return header_rows, all_data_rows, file_order
+    
+    @staticmethod
+    def _dedup_masks(dedup, accepted, header_rows):
+        """
+        计算每个文件中去重后保留的行
+        
+        Args:
+            dedup (RowDeduplicator): 去重配置
+            accepted (list): (result, 列映射) 列表，按合并顺序
+            header_rows (list): 统一的表头行
+            
+        Returns:
+            list: 每个文件的 bytearray，1 表示保留
+        """
+        with stage("dedup", keep=dedup.keep, approximate=dedup.approximate) as info:
+            # 整行比较时的列数：统一表头的列数，按位置合并的文件取其中最宽的行
+            width = len(header_rows[-1]) if header_rows else 0
+            for result, mapping in accepted:
+                if mapping is None:
+                    width = max(width, max(map(len, result.data_rows)))
+            positions = dedup.key_positions(header_rows, width)
+            
+            hash_arrays = []
+            key_sources = []
+            for result, mapping in accepted:
+                source_positions = positions
+                if mapping is not None:
+                    # 该文件缺少的键列为 None，键值按 None 比较
+                    source_positions = [mapping.vector[p] if p < len(mapping.vector) else None for p in positions]
+                hash_arrays.append(row_hashes(result.data_rows, source_positions))
+                key_sources.append((result.data_rows, source_positions))
+            
+            masks, duplicates = dedup.keep_masks(hash_arrays, key_sources)
+            info["rows"] = sum(map(len, masks))
+            info["duplicates"] = sum(duplicates)
+        if info["duplicates"]:
+            logger.info(f"  共去除 {info['duplicates']} 行重复数据")
+        return masks
+    
+    @staticmethod
+    def _plan_alignment(aligner, result):
+        """
+        计算一个文件到统一列顺序的映射，并记录缺少、新增或调换顺序的列
+        
+        Returns:
+            ColumnMapping: 映射；与第一个文件没有相同的列名时返回 None，按列位置合并
+        """
+        mapping = aligner.plan(result.header_rows)
+        if mapping is None:
+            logger.warning(f"  警告: {result.file_name} 的表头与第一个文件没有相同的列名，按列位置合并")
+            return None
+        
+        missing = [str(name) for name in mapping.missing if name is not None]
+        extra = [str(name) for name in mapping.extra if name is not None]
+        if missing:
+            logger.warning(f"  警告: {result.file_name} 缺少列: {', '.join(missing)}")
+        if extra:
+            logger.info(f"  {result.file_name} 新增列（追加在末尾）: {', '.join(extra)}")
+        if mapping.reordered and not missing and not extra:
+            logger.info(f"  {result.file_name} 的列顺序与第一个文件不同，已按表头对齐")
+        return mapping
+    
+    @staticmethod
+    def stream_merge(files, target_sheet, header_rows_count, renumber=True):
+        """
+        流式合并多个 Excel 文件的指定 Sheet
+        
+        与 merge_sheets 不同，数据行不会先全部读入内存，而是在迭代时逐行产出，
+        峰值内存只与单行数据相关。表头从第一个包含该 Sheet 的文件中立即读取。
+        
+        第一列是否重新编号在产出第一行之前就确定（与 merge_sheets 的判断相同）：
+        先把所有文件的数据行读一遍，只检查第一列，遇到非数字值即停止；第一列都是数字时
+        读取时间约为两倍，renumber=False 可跳过。
+        整列都是数字时全部重新编号，否则全部保持原值，不会出现只编号了一部分的列。
+        
+        Args:
+            files (list): Excel 文件路径列表
+            target_sheet (str): 要合并的 Sheet 名称
+            header_rows_count (int): 表头行数
+            renumber (bool): False 时跳过预读，第一列保持原值
+            
+        Returns:
+            tuple: (header_rows, row_iterator, file_order) 或 (None, None, None) 如果失败。
+                   file_order 会在迭代过程中逐步填充
+        """
+        pending = list(files)
+        first_stream = None
+        header_rows = None
+        
+        # 找到第一个可以提供完整表头的文件
+        while pending and header_rows is None:
+            file_path = pending.pop(0)
+            stream = SheetStream(file_path, target_sheet, header_rows_count)
+            try:
+                if stream.open() and len(stream.header_rows) >= header_rows_count:
+                    header_rows = stream.header_rows
+                    first_stream = stream
+                    logger.info(f"  保存表头行（前 {header_rows_count} 行）")
+                else:
+                    if stream.warning:
+                        logger.warning(f"  警告: {stream.warning}")
+                    stream.close()
+            except Exception as e:
+                stream.close()
+                logger.error(f"  错误: 无法读取文件 {os.path.basename(file_path)}: {e}")
+        
+        if header_rows is None:
+            return None, None, None
+        
+        file_order = []
+        
+        def generate():
+            counter = 0
+            numbered = renumber and ExcelMerger._first_column_numeric(
+                [first_stream.file_path] + pending, target_sheet, header_rows_count
             )
+            streams = [first_stream]
+            streams.extend(SheetStream(f, target_sheet, header_rows_count) for f in pending)
+            for stream in streams:
+                try:
+                    if stream is not first_stream and not stream.open():
+                        logger.warning(f"  警告: {stream.warning}")
+                        continue
+                    kept = 0
+                    for row in stream:
+                        if kept == 0:
+                            file_order.append(os.path.basename(stream.file_path))
+                        kept += 1
+                        if numbered and row:
+                            counter += 1
+                            row[0] = counter
+                        yield row
+                    if kept:
+                        logger.info(f"  提取了 {kept} 行有效数据（共读取 {stream.rows_read} 行）")
+                except Exception as e:
+                    logger.error(f"  错误: 无法读取文件 {os.path.basename(stream.file_path)}: {e}")
+                finally:
+                    stream.close()
+        
+        return header_rows, generate(), file_order
+    
+    @staticmethod
+    def _first_column_numeric(files, target_sheet, header_rows_count):
+        """
+        stream_merge 的预读：依次读取各文件的数据行，判断第一列是否除空值外都是数字
+        
+        每次只读取 RENUMBER_SCAN_BATCH_ROWS 行，遇到非数字值即停止，不会再多解析一整批；
+        第一列都是数字时仍需读完所有文件。无法读取的文件跳过（合并时同样会被跳过）。
+        """
+        with stage("renumber_scan", files=len(files)) as info:
+            info["numeric"] = True
+            info["rows"] = 0
+            for file_path in files:
+                stream = SheetStream(file_path, target_sheet, header_rows_count)
+                try:
+                    if not stream.open():
+                        continue
+                    for batch in stream.iter_batches(RENUMBER_SCAN_BATCH_ROWS):
+                        if not column_is_numeric(batch.column(0)):
+                            info["numeric"] = False
+                            return False
+                except Exception:
+                    continue
+                finally:
+                    info["rows"] += stream.rows_read
+                    stream.close()
+        return True
+    
+    @staticmethod
+    def merge_to_file(files, target_sheet, header_rows_count, all_sheet_names, directory=".", output_format="xlsx",
+                      renumber=True):
+        """
+        以流水线方式合并并保存：流式读取 + 只写模式输出，内存占用恒定
+        
+        Args:
+            files (list): Excel 文件路径列表
+            target_sheet (str): 要合并的 Sheet 名称
+            header_rows_count (int): 表头行数
+            all_sheet_names (list): 所有 Sheet 名称
+            directory (str): 输出目录
+            output_format (str): 输出格式，参见 create_output_file
+            renumber (bool): 参见 stream_merge
             
-            if is_numeric:
-                for i, row in enumerate(all_data_rows, 1):
-                    if row:
-                        row[0] = i
+        Returns:
+            str: 输出文件路径，或 None 如果失败
+        """
+        header_rows, row_iter, file_order = ExcelMerger.stream_merge(
+            files, target_sheet, header_rows_count, renumber
+        )
+        if header_rows is None:
+            return None
         
-        return header_rows, all_data_rows, file_order
+        return ExcelMerger.create_output_file(
+            header_rows, row_iter, target_sheet, file_order, all_sheet_names, directory,
+            write_only=True, output_format=output_format
+        )
     
     @staticmethod
-    def create_output_file(header_rows, data_rows, target_sheet_name, file_order, all_sheet_names, directory="."):
+    def _write_xlsx(output_path, header_rows, data_rows, target_sheet_name, all_sheet_names,
+                    write_only=False, width_sample_rows=None, sheet_data=None):
         """
-        创建输出 Excel 文件
+        写出 XLSX，有数据的 Sheet 超过 Excel 行数上限时自动拆分到后续 Sheet
+        
+        Returns:
+            tuple: ({Sheet 名称: 数据行数}, {Sheet 名称: 数据所在的 Sheet 名称列表})，只包含有数据的 Sheet
+        """
+        if write_only and width_sample_rows is None:
+            width_sample_rows = WRITE_ONLY_WIDTH_SAMPLE_ROWS
+        
+        contents = dict(sheet_data or {})
+        contents[target_sheet_name] = (header_rows, data_rows)
+        
+        # 创建新工作簿
+        if write_only:
+            wb = openpyxl.Workbook(write_only=True)
+        else:
+            wb = openpyxl.Workbook()
+            wb.remove(wb.active)
+        
+        row_counts = {}
+        titles = {}
+        
+        # 按原有顺序创建 Sheet，没有合并数据的 Sheet 保持为空
+        for sheet_name in all_sheet_names:
+            if sheet_name not in contents:
+                wb.create_sheet(title=sheet_name)
+                continue
+            
+            sheet_headers, sheet_rows = contents[sheet_name]
+            row_counts[sheet_name], titles[sheet_name] = ExcelMerger._write_sheet(
+                wb, sheet_name, sheet_headers, sheet_rows, write_only, width_sample_rows
+            )
+        
+        # 保存文件
+        wb.save(output_path)
+        wb.close()
+        
+        return row_counts, titles
+    
+    @staticmethod
+    def _write_sheet(wb, sheet_name, header_rows, data_rows, write_only, width_sample_rows):
+        """
+        写入一个 Sheet 的表头和数据行，超过行数上限时拆分为 "<Sheet>_2"、"<Sheet>_3" ...
+        
+        Returns:
+            tuple: (数据行数, 数据所在的 Sheet 名称列表)
+        """
+        row_count = 0
+        titles = []
+        max_data_rows = EXCEL_MAX_ROWS - len(header_rows)
+        
+        estimator = ColumnWidthEstimator(sample_rows=width_sample_rows)
+        for header_row in header_rows:
+            estimator.observe(header_row)
+        rows = iter(data_rows)
+        
+        if write_only:
+            # 只写模式下列宽必须在第一行写入前设置，先缓存采样行
+            buffered = list(itertools.islice(rows, max(width_sample_rows - len(header_rows), 0)))
+            for row in buffered:
+                estimator.observe(row)
+            rows = itertools.chain(buffered, rows)
+        
+        sheets = []
+        while True:
+            part = len(sheets) + 1
+            title = sheet_name if part == 1 else _split_sheet_title(sheet_name, part)
+            ws = wb.create_sheet(title=title)
+            sheets.append(ws)
+            titles.append(title)
+            if write_only:
+                estimator.apply(ws)
+            
+            # 每个拆分出的 Sheet 都带有完整表头
+            for header_row in header_rows:
+                ws.append(header_row)
+            
+            written = 0
+            for row in itertools.islice(rows, max_data_rows):
+                ws.append(row)
+                written += 1
+                if not write_only:
+                    estimator.observe(row)
+            row_count += written
+            
+            if written < max_data_rows:
+                break
+            
+            # 刚好写满时确认是否还有剩余数据，避免产生空 Sheet
+            next_row = next(rows, None)
+            if next_row is None:
+                break
+            rows = itertools.chain([next_row], rows)
+        
+        if not write_only:
+            for ws in sheets:
+                estimator.apply(ws)
+        
+        return row_count, titles
+    
+    @staticmethod
+    def create_output_file(header_rows, data_rows, target_sheet_name, file_order, all_sheet_names, directory=".",
+                           write_only=False, width_sample_rows=None, output_format="xlsx",
+                           encoding=DEFAULT_CSV_ENCODING, sheet_data=None):
+        """
+        创建输出文件
         
         Args:
             header_rows (list): 表头行数据
-            data_rows (list): 数据行
+            data_rows (iterable): 数据行，可以是列表或 stream_merge 返回的迭代器
             target_sheet_name (str): 目标 Sheet 名称
             file_order (list): 文件处理顺序
-            all_sheet_names (list): 所有 Sheet 名称
+            all_sheet_names (list): 所有 Sheet 名称（仅 XLSX 使用）
             directory (str): 输出目录
+            write_only (bool): 是否使用只写模式。只写模式下数据行边产生边写入磁盘，内存占用恒定
+            width_sample_rows (int): 估算列宽时统计的行数（含表头），None 表示统计全部行。
+                                     只写模式下默认为 WRITE_ONLY_WIDTH_SAMPLE_ROWS
+            output_format (str): 输出格式，"xlsx"、"csv" 或 "parquet"（需要 pyarrow）。
+                                 XLSX 超过 1,048,576 行时自动拆分为多个 Sheet
+            encoding (str): CSV 文件编码
+            sheet_data (dict): 其他 Sheet 的合并数据 {Sheet 名称: (header_rows, data_rows)}（仅 XLSX）。
+                               all_sheet_names 中出现在这里的 Sheet 写入合并数据，其余仍为空 Sheet
             
         Returns:
             str: 输出文件路径，或 None 如果失败
         """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}")
+        if sheet_data and output_format != "xlsx":
+            raise ValueError("只有 XLSX 输出可以包含多个 Sheet")
+        extension = OUTPUT_FORMATS[output_format]
+        
+        label = target_sheet_name
+        if sheet_data:
+            label = f"{target_sheet_name}等{len(sheet_data) + 1}个Sheet"
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"合并结果_{target_sheet_name}_{timestamp}.xlsx"
+        output_filename = f"合并结果_{label}_{timestamp}{extension}"
         output_path = os.path.join(directory, output_filename)
+        # 同一秒内多次合并时不覆盖已有结果（增量合并时上一次的结果可能正在被读取）
+        suffix = 1
+        while os.path.exists(output_path):
+            output_filename = f"合并结果_{label}_{timestamp}_{suffix}{extension}"
+            output_path = os.path.join(directory, output_filename)
+            suffix += 1
         
         try:
-            # 创建新工作簿
-            wb = openpyxl.Workbook()
-            wb.remove(wb.active)
-            
-            # 为每个原有 Sheet 创建空 Sheet
-            for sheet_name in all_sheet_names:
-                ws = wb.create_sheet(title=sheet_name)
-                
-                if sheet_name == target_sheet_name:
-                    # 写入表头行
-                    for header_row in header_rows:
-                        ws.append(header_row)
-                    
-                    # 写入数据行
-                    for data_row in data_rows:
-                        ws.append(data_row)
-                    
-                    # 调整列宽
-                    for col_idx, column in enumerate(ws.columns, 1):
-                        max_length = 0
-                        for cell in column:
-                            try:
-                                cell_len = len(str(cell.value)) if cell.value else 0
-                                if cell_len > max_length:
-                                    max_length = cell_len
-                            except:
-                                pass
-                        
-                        adjusted_width = min(max_length + 2, 50)
-                        col_letter = get_column_letter(col_idx)
-                        ws.column_dimensions[col_letter].width = adjusted_width
-            
-            # 保存文件
-            wb.save(output_path)
-            wb.close()
+            row_counts = {}
+            titles = {}
+            with stage("write", format=output_format, write_only=write_only) as info:
+                if output_format == "csv":
+                    row_count = write_csv(output_path, header_rows, data_rows, encoding)
+                elif output_format == "parquet":
+                    row_count = write_parquet(output_path, header_rows, data_rows)
+                else:
+                    row_counts, titles = ExcelMerger._write_xlsx(
+                        output_path, header_rows, data_rows, target_sheet_name, all_sheet_names,
+                        write_only, width_sample_rows, sheet_data
+                    )
+                    row_count = row_counts.get(target_sheet_name, 0)
+                info["rows"] = sum(row_counts.values()) if row_counts else row_count
+                info["bytes"] = os.path.getsize(output_path)
             
-            print(f"\n合并结果已保存到: {output_filename}")
-            print(f"文件结构:")
+            logger.info(f"\n合并结果已保存到: {output_filename}")
+            logger.info(f"文件结构:")
             end_header_row = len(header_rows)
             if end_header_row == 1:
-                print(f"  - 第1行: 表头")
+                logger.info(f"  - 第1行: 表头")
             else:
-                print(f"  - 第1-{end_header_row}行: 表头")
-            print(f"  - 第{end_header_row + 1}行起: 合并的数据行（共 {len(data_rows)} 行）")
+                logger.info(f"  - 第1-{end_header_row}行: 表头")
+            logger.info(f"  - 第{end_header_row + 1}行起: 合并的数据行（共 {row_count} 行）")
+            target_titles = titles.get(target_sheet_name, [])
+            if len(target_titles) > 1:
+                logger.info(f"  - 超过 Excel 行数上限，数据已拆分到 {len(target_titles)} 个 Sheet: {', '.join(target_titles)}")
+            for sheet_name in sheet_data or {}:
+                if sheet_name in row_counts:
+                    logger.info(f"  - Sheet {sheet_name}: 合并了 {row_counts[sheet_name]} 行数据")
             
-            print(f"\n合并时使用的 Excel 文件顺序:")
+            logger.info(f"\n合并时使用的 Excel 文件顺序:")
             for i, filename in enumerate(file_order, 1):
-                print(f"  {i}. {filename}")
+                logger.info(f"  {i}. {filename}")
             
             return output_path
             
         except Exception as e:
-            print(f"保存文件时出错: {e}")
+            logger.error(f"保存文件时出错: {e}")
             return None
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输出格式模块 - 除 XLSX 外，合并结果还可以流式写出为 CSV 或 Parquet
+"""
+
+import csv
+import itertools
+import importlib.util
+from datetime import date, datetime, time
+
+
+# CSV 默认带 BOM，Excel 打开时中文不会乱码
+DEFAULT_CSV_ENCODING = "utf-8-sig"
+
+# Parquet 每批写入的行数
+PARQUET_BATCH_ROWS = 65536
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+def parquet_available():
+    """是否安装了 pyarrow"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def write_csv(output_path, header_rows, data_rows, encoding=DEFAULT_CSV_ENCODING):
+    """
+    流式写出 CSV
+
+    Args:
+        output_path (str): 输出文件路径
+        header_rows (list): 表头行，原样写在最前面
+        data_rows (iterable): 数据行
+        encoding (str): 文件编码，无法编码的字符用 ? 代替
+
+    Returns:
+        int: 写出的数据行数
+    """
+    row_count = 0
+    with open(output_path, "w", encoding=encoding, errors="replace", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerows(header_rows)
+        for row in data_rows:
+            writer.writerow(row)
+            row_count += 1
+    return row_count
+
+
+def _column_names(header_rows, column_count):
+    """用最后一行表头作为列名，空白和重复的列名自动补齐"""
+    last_header = header_rows[-1] if header_rows else []
+    names = []
+    seen = set()
+    for idx in range(column_count):
+        value = last_header[idx] if idx < len(last_header) else None
+        name = str(value).strip() if value is not None else ""
+        if not name:
+            name = f"列{idx + 1}"
+        base, suffix = name, 2
+        while name in seen:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _value_kind(value):
+    """单元格值的类别，用于确定列类型"""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        # 超出 int64 的整数只能按字符串保存
+        return "int" if _INT64_MIN <= value <= _INT64_MAX else "string"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, datetime):
+        return "datetime"
+    if isinstance(value, date):
+        return "date"
+    return "string"
+
+
+def _scan_kinds(rows, kinds):
+    """把 rows 中每列出现的值类别加入 kinds（每列一个 set，列数不足时补齐）"""
+    for row in rows:
+        while len(kinds) < len(row):
+            kinds.append(set())
+        for column_kinds, value in zip(kinds, row):
+            if value is not None:
+                column_kinds.add(_value_kind(value))
+
+
+def _arrow_type(pa, kinds):
+    """
+    根据一列出现过的值类别确定 Arrow 类型
+
+    整数和小数混杂时使用小数，其他混杂类型（或整列为空）使用字符串，任何值都能无损写入。
+    """
+    if kinds == {"bool"}:
+        return pa.bool_()
+    if kinds == {"int"}:
+        return pa.int64()
+    if kinds and kinds <= {"int", "float"}:
+        return pa.float64()
+    if kinds == {"datetime"}:
+        return pa.timestamp("us")
+    if kinds == {"date"}:
+        return pa.date32()
+    return pa.string()
+
+
+def _coerce(pa, arrow_type, value):
+    """把值转换为列类型；列类型由全部数据确定，值总是可以转换"""
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type):
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        return str(value)
+    if pa.types.is_float64(arrow_type):
+        return float(value)
+    return value
+
+
+def _batches(rows, batch_rows):
+    """把数据行按 batch_rows 行一批分组"""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_rows))
+        if not batch:
+            return
+        yield batch
+
+
+def _spooled_batches(spool):
+    """依次读出暂存在临时文件中的各批数据行"""
+    import pickle
+
+    spool.seek(0)
+    while True:
+        try:
+            yield pickle.load(spool)
+        except EOFError:
+            return
+
+
+def write_parquet(output_path, header_rows, data_rows, batch_rows=PARQUET_BATCH_ROWS):
+    """
+    按批写出 Parquet
+
+    列名取自最后一行表头。写出前先扫描全部数据行确定每列的类型（整数和小数混杂时使用小数，
+    其他混杂类型使用字符串），不会有值因与列类型不符而丢失。data_rows 可以重复遍历时
+    （列表、RowStore）扫描后再遍历一次写出；只能遍历一次的迭代器（例如 stream_merge 的结果）
+    在扫描时按批暂存到临时文件。
+
+    Args:
+        output_path (str): 输出文件路径
+        header_rows (list): 表头行
+        data_rows (iterable): 数据行
+        batch_rows (int): 每批行数
+
+    Returns:
+        int: 写出的数据行数
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("输出 Parquet 需要安装 pyarrow（pip install pyarrow）")
+    # 界面启动时会导入本模块，pickle 和 tempfile 只在写出 Parquet 时导入
+    import pickle
+    import tempfile
+
+    spool = None
+    if iter(data_rows) is data_rows:
+        spool = tempfile.TemporaryFile(prefix="excel_merger_parquet_")
+
+    try:
+        kinds = []
+        for batch in _batches(data_rows, batch_rows):
+            _scan_kinds(batch, kinds)
+            if spool is not None:
+                pickle.dump(batch, spool, pickle.HIGHEST_PROTOCOL)
+
+        column_count = max([len(kinds)] + [len(r) for r in header_rows])
+        while len(kinds) < column_count:
+            kinds.append(set())
+        names = _column_names(header_rows, column_count)
+        schema = pa.schema([pa.field(name, _arrow_type(pa, k)) for name, k in zip(names, kinds)])
+
+        batches = _spooled_batches(spool) if spool is not None else _batches(data_rows, batch_rows)
+        row_count = 0
+        with pq.ParquetWriter(output_path, schema) as writer:
+            for batch in batches:
+                arrays = [
+                    pa.array(
+                        [_coerce(pa, field.type, r[idx]) if idx < len(r) else None for r in batch],
+                        type=field.type,
+                    )
+                    for idx, field in enumerate(schema)
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                row_count += len(batch)
+    finally:
+        if spool is not None:
+            spool.close()
+
+    return row_count
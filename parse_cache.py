@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析结果缓存模块 - 未修改的源文件直接从磁盘缓存加载，无需重新解析 XLSX
+"""
+
+import os
+import sys
+import zlib
+import pickle
+import hashlib
+
+
+# 缓存格式版本，提取逻辑变化时递增以使旧缓存失效
+CACHE_VERSION = 1
+
+# 默认缓存上限 512 MB
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+CACHE_SUFFIX = ".cache"
+
+# 淘汰时把总大小降到 max_bytes 的这个比例，留出余量，缓存已满时不必每次写入都扫描目录
+EVICT_TARGET_RATIO = 0.9
+
+
+def default_cache_dir():
+    """获取默认缓存目录"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "ExcelMerger", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "excel_merger")
+
+
+def file_fingerprint(file_path, hash_content=False):
+    """
+    计算文件指纹
+
+    Args:
+        file_path (str): 文件路径
+        hash_content (bool): True 时使用文件内容的 SHA-1，否则使用大小和修改时间
+
+    Returns:
+        str: 指纹字符串
+    """
+    return _fingerprint_from_stat(file_path, os.stat(file_path), hash_content)
+
+
+def _fingerprint_from_stat(file_path, st, hash_content):
+    if not hash_content:
+        return f"{st.st_size}:{st.st_mtime_ns}"
+
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"{st.st_size}:{digest.hexdigest()}"
+
+
+class ParseCache:
+    """
+    按 (文件路径, 文件指纹, Sheet 名称, 表头行数) 缓存提取出的表头和数据行
+
+    每个条目是一个 zlib 压缩的 pickle 文件，命中时更新其修改时间，
+    总大小超过 max_bytes 时按最近最少使用（LRU）顺序淘汰。总大小只在第一次写入和需要淘汰时
+    扫描目录得到，其余写入在内存中累加，不会每次写入都遍历整个缓存目录。
+    hash_content 时文件内容的哈希按 (路径, 大小, 修改时间) 记住，同一文件的 contains、get、put
+    以及多个 Sheet 只读取一次文件内容。
+    缓存读写失败不会影响合并，只会退化为重新解析。
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, hash_content=False):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self.hits = 0
+        self.misses = 0
+        # 缓存目录的总大小，None 表示尚未扫描
+        self._total_bytes = None
+        # (绝对路径, 大小, 修改时间) -> 文件指纹
+        self._fingerprints = {}
+
+    def _fingerprint(self, file_path):
+        st = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+        fingerprint = self._fingerprints.get(memo_key)
+        if fingerprint is None:
+            fingerprint = _fingerprint_from_stat(file_path, st, self.hash_content)
+            self._fingerprints[memo_key] = fingerprint
+        return fingerprint
+
+    def _entry_path(self, file_path, target_sheet, header_rows_count):
+        fingerprint = self._fingerprint(file_path)
+        key = "\0".join([
+            str(CACHE_VERSION),
+            os.path.abspath(file_path),
+            fingerprint,
+            target_sheet,
+            str(header_rows_count),
+        ])
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + CACHE_SUFFIX)
+
+    def get(self, file_path, target_sheet, header_rows_count):
+        """
+        读取缓存
+
+        Returns:
+            dict: 缓存的提取结果，未命中时返回 None
+        """
+        try:
+            entry_path = self._entry_path(file_path, target_sheet, header_rows_count)
+            with open(entry_path, "rb") as f:
+                entry = pickle.loads(zlib.decompress(f.read()))
+            # 更新修改时间，作为 LRU 的访问时间
+            os.utime(entry_path)
+        except Exception:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def contains(self, file_path, target_sheet, header_rows_count):
+        """是否有对应的缓存条目，不读取内容，也不计入命中或未命中"""
+        try:
+            return os.path.exists(self._entry_path(file_path, target_sheet, header_rows_count))
+        except OSError:
+            return False
+
+    def put(self, file_path, target_sheet, header_rows_count, entry):
+        """
+        写入缓存
+
+        Args:
+            entry (dict): 可被 pickle 的提取结果
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_path = self._entry_path(file_path, target_sheet, header_rows_count)
+            data = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            # 先写临时文件再替换，避免并发运行时读到半个文件
+            tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(entry_path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, entry_path)
+            if self._total_bytes is None:
+                self.evict()
+            else:
+                self._total_bytes += len(data) - replaced
+                if self._total_bytes > self.max_bytes:
+                    self.evict()
+        except Exception:
+            pass
+
+    def evict(self):
+        """扫描缓存目录；总大小超过 max_bytes 时淘汰最久未使用的条目，直到降到 max_bytes 的 EVICT_TARGET_RATIO"""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(CACHE_SUFFIX):
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+
+        self._total_bytes = total
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= target:
+                break
+        self._total_bytes = total
+
+    def clear(self):
+        """清空缓存"""
+        self._total_bytes = None
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_SUFFIX):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
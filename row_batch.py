@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行批次模块 - 按列批量判断空行、检查和重新编号第一列
+
+一批行按需以列的形式访问。空行检测逐列进行，每一列只检查前面各列都为空的行，
+通常第一列就能确定绝大多数行不是空行；单元格的判断通过 map 调用 C 实现的函数
+（operator.is_、str.isdigit 等），不再对每个单元格调用 str(cell).strip()。
+安装了 NumPy 时用数组记录待定的行号，否则使用 array 模块。
+"""
+
+import operator
+import itertools
+from array import array
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_NONE_TYPE = type(None)
+
+
+def _blank_flags(values):
+    """每个值是否为空（None 或只含空白字符的字符串），返回 bytearray"""
+    types = set(map(type, values))
+    if _NONE_TYPE not in types and not any(issubclass(t, str) for t in types):
+        return bytearray(len(values))
+    flags = bytearray(map(operator.is_, values, itertools.repeat(None)))
+    string_idx = list(itertools.compress(range(len(values)), map(isinstance, values, itertools.repeat(str))))
+    if string_idx:
+        stripped = map(str.strip, map(values.__getitem__, string_idx))
+        # 只含空白的字符串很少见，只有它们需要逐个标记
+        for idx in itertools.compress(string_idx, map(operator.not_, stripped)):
+            flags[idx] = 1
+    return flags
+
+
+def column_is_numeric(values):
+    """
+    除 None 外的值是否都是数字或纯数字字符串
+
+    与逐个判断每个值（数字，或 str.isdigit() 为真的字符串）的结果相同，但先按值的类型整体判断，
+    只有字符串才需要逐个检查。
+    """
+    types = set(map(type, values))
+    types.discard(_NONE_TYPE)
+    if not all(issubclass(t, (int, float, str)) for t in types):
+        return False
+    if not any(issubclass(t, str) for t in types):
+        return True
+    strings = itertools.compress(values, map(isinstance, values, itertools.repeat(str)))
+    return all(map(str.isdigit, strings))
+
+
+def renumber_first_column(rows, start=1):
+    """
+    把每行的第一个单元格依次改为 start, start + 1, ...
+
+    Args:
+        rows (list): 非空的 list 行
+        start (int): 起始编号
+
+    Returns:
+        int: 下一个编号
+    """
+    end = start + len(rows)
+    deque(map(operator.setitem, rows, itertools.repeat(0), range(start, end)), maxlen=0)
+    return end
+
+
+class RowBatch:
+    """
+    一批数据行
+
+    rows 保持读取时的顺序，column(idx) 按需取出一列并缓存。
+    同一个 Sheet 读出的行通常等宽，长度不一时较短的行在缺失的列上视为 None。
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        lengths = set(map(len, rows))
+        self.width = max(lengths, default=0)
+        self.uniform = len(lengths) <= 1
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, idx):
+        """第 idx 列的值（list）"""
+        column = self._columns.get(idx)
+        if column is None:
+            column = self._take(idx, self.rows)
+            self._columns[idx] = column
+        return column
+
+    def _take(self, idx, rows):
+        """rows 中每行第 idx 列的值"""
+        if self.uniform:
+            return list(map(operator.itemgetter(idx), rows))
+        return [row[idx] if idx < len(row) else None for row in rows]
+
+    def nonempty_mask(self):
+        """
+        每行是否至少有一个非空单元格
+
+        Returns:
+            bytearray: 与行数等长，1 表示保留
+        """
+        count = len(self.rows)
+        undecided = np.arange(count) if np is not None else array("l", range(count))
+        for idx in range(self.width):
+            if not len(undecided):
+                break
+            if len(undecided) == count:
+                values = self.column(idx)
+            else:
+                # 只取出仍待定的行，不必构造整列
+                values = self._take(idx, list(map(self.rows.__getitem__, undecided.tolist())))
+            if values.count(None) == len(values):
+                continue
+            blank = _blank_flags(values)
+            if np is not None:
+                undecided = undecided[np.frombuffer(blank, dtype=np.bool_)]
+            else:
+                undecided = array("l", itertools.compress(undecided, blank))
+
+        mask = bytearray(b"\x01") * count
+        for row_idx in undecided.tolist():
+            mask[row_idx] = 0
+        return mask
+
+    def drop_empty(self):
+        """去掉空行，剩余的行转换为 list，返回新的 RowBatch"""
+        kept = itertools.compress(self.rows, self.nonempty_mask())
+        return RowBatch(list(map(list, kept)))
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑的行存储 - 合并后的数据行按块、按列编码保存，迭代时还原为 list 行
+
+每 chunk_rows 行封装为一个块，块内逐列选择编码：
+    int    - 全部为整数（不含 bool）时使用 array('q')，空值另存标记
+    float  - 全部为小数时使用 array('d')
+    datetime - 全部为不带时区的日期时间时，以距 1970-01-01 的微秒数保存在 array('q') 中
+    str    - 全部为字符串时使用字典编码：整个存储共享一张字符串表，列中只保存编号
+    object - 类型混杂（日期、布尔值等）时保存原值，其中的字符串同样去重
+超过 max_memory_rows 行后，新封装的块 pickle 到临时文件中，迭代时再逐块读回。
+"""
+
+import pickle
+import operator
+import itertools
+import tempfile
+from array import array
+from datetime import datetime, timedelta
+
+from row_batch import RowBatch, column_is_numeric, renumber_first_column
+
+
+# 每块的行数
+DEFAULT_CHUNK_ROWS = 65536
+
+# flush() 默认至少封装的行数，更少的行继续等待，避免许多小文件各自产生一个小块
+DEFAULT_FLUSH_MIN_ROWS = 4096
+
+_NONE_TYPE = type(None)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class _Chunk:
+    """已封装的一块行"""
+
+    __slots__ = ("count", "lengths", "columns", "first_column_numeric")
+
+    def __init__(self, count, lengths, columns, first_column_numeric):
+        self.count = count
+        # 行宽不一致时记录每行的长度，还原时截去补齐的 None
+        self.lengths = lengths
+        self.columns = columns
+        self.first_column_numeric = first_column_numeric
+
+
+class RowStore:
+    """
+    紧凑的行存储
+
+    用法与 list 类似：extend/append 追加行，len() 取行数，迭代时逐行产出新的 list，
+    可以多次迭代。用完后调用 close() 删除溢出文件。
+    """
+
+    def __init__(self, chunk_rows=DEFAULT_CHUNK_ROWS, max_memory_rows=None, spill_dir=None):
+        """
+        Args:
+            chunk_rows (int): 每块的行数
+            max_memory_rows (int): 内存中最多保留的已封装行数，超过后新块写入临时文件，None 表示不溢出
+            spill_dir (str): 临时文件所在目录，None 时使用系统临时目录
+        """
+        self.chunk_rows = chunk_rows
+        self.max_memory_rows = max_memory_rows
+        self.spill_dir = spill_dir
+        self.renumbered = False
+        self._chunks = []
+        self._pending = []
+        self._count = 0
+        self._memory_rows = 0
+        self._spill_file = None
+        # 编号 0 表示 None
+        self._strings = [None]
+        self._codes = {None: 0}
+
+    def __len__(self):
+        return self._count
+
+    def append(self, row):
+        self._pending.append(row)
+        self._count += 1
+        if len(self._pending) >= self.chunk_rows:
+            self._seal()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def flush(self, min_rows=DEFAULT_FLUSH_MIN_ROWS):
+        """
+        待处理的行不少于 min_rows 时立即封装为一块（块可以少于 chunk_rows 行），
+        原来的 list 行随之释放。逐个文件追加时在每个文件之后调用，待处理的行不会累积到整块。
+        """
+        if len(self._pending) >= max(min_rows, 1):
+            self._seal()
+
+    @property
+    def spilled_chunks(self):
+        """写入临时文件的块数"""
+        return sum(1 for chunk in self._chunks if not isinstance(chunk, _Chunk))
+
+    def _intern(self, values):
+        """给新出现的字符串分配编号"""
+        for value in set(values).difference(self._codes):
+            self._codes[value] = len(self._strings)
+            self._strings.append(value)
+
+    def _encode(self, values):
+        types = set(map(type, values))
+        has_nulls = _NONE_TYPE in types
+        types.discard(_NONE_TYPE)
+        nulls = bytearray(map(operator.is_, values, itertools.repeat(None))) if has_nulls else None
+
+        if types == {str}:
+            self._intern(values)
+            return ("str", array("i", map(self._codes.__getitem__, values)), None)
+
+        if types == {int} or types == {float}:
+            typecode = "q" if types == {int} else "d"
+            filled = [0 if value is None else value for value in values] if has_nulls else values
+            try:
+                return ("int" if typecode == "q" else "float", array(typecode, filled), nulls)
+            except OverflowError:
+                pass
+
+        if types == {datetime}:
+            filled = [_EPOCH if value is None else value for value in values] if has_nulls else values
+            try:
+                deltas = map(operator.sub, filled, itertools.repeat(_EPOCH))
+                micros = array("q", map(operator.floordiv, deltas, itertools.repeat(_MICROSECOND)))
+                return ("datetime", micros, nulls)
+            except TypeError:
+                # 带时区的日期时间不能与 _EPOCH 相减，按原值保存
+                pass
+
+        strings = [value for value in values if isinstance(value, str)]
+        if strings:
+            self._intern(strings)
+            strings = self._strings
+            codes = self._codes
+            values = [strings[codes[value]] if isinstance(value, str) else value for value in values]
+        return ("object", values, None)
+
+    def _decode(self, column, count):
+        kind, data, nulls = column
+        if kind == "str":
+            return list(map(self._strings.__getitem__, data))
+        if kind == "object":
+            return data
+        if kind == "datetime":
+            zeros = itertools.repeat(0)
+            values = list(map(_EPOCH.__add__, map(timedelta, zeros, zeros, data)))
+        else:
+            values = data.tolist()
+        if nulls is not None:
+            for idx in itertools.compress(range(count), nulls):
+                values[idx] = None
+        return values
+
+    def _seal(self):
+        """把待处理的行封装为一块"""
+        rows = self._pending
+        self._pending = []
+        if not rows:
+            return
+
+        batch = RowBatch(rows)
+        lengths = None if batch.uniform else array("H", map(len, rows))
+        columns = [self._encode(batch.column(idx)) for idx in range(batch.width)]
+        first_numeric = batch.width > 0 and column_is_numeric(batch.column(0))
+        chunk = _Chunk(len(rows), lengths, columns, first_numeric)
+
+        if self.max_memory_rows is not None and self._memory_rows + chunk.count > self.max_memory_rows:
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile(prefix="excel_merger_rows_", dir=self.spill_dir)
+            self._spill_file.seek(0, 2)
+            offset = self._spill_file.tell()
+            pickle.dump(chunk, self._spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+            self._chunks.append((offset, chunk.count, chunk.first_column_numeric))
+        else:
+            self._memory_rows += chunk.count
+            self._chunks.append(chunk)
+
+    def _load(self, entry):
+        if isinstance(entry, _Chunk):
+            return entry
+        self._spill_file.seek(entry[0])
+        return pickle.load(self._spill_file)
+
+    def _chunk_rows(self, chunk):
+        """把一块还原为 list 行"""
+        if not chunk.columns:
+            return [[] for _ in range(chunk.count)]
+        columns = [self._decode(column, chunk.count) for column in chunk.columns]
+        rows = list(map(list, zip(*columns)))
+        if chunk.lengths is not None:
+            rows = [row[:length] for row, length in zip(rows, chunk.lengths)]
+        return rows
+
+    def renumber_first_column(self):
+        """
+        第一列全部为数字（或纯数字字符串）时，迭代时把第一列依次编号为 1, 2, ...
+
+        Returns:
+            bool: 是否重新编号
+        """
+        numeric = all(
+            entry.first_column_numeric if isinstance(entry, _Chunk) else entry[2]
+            for entry in self._chunks
+        )
+        if numeric and self._pending:
+            numeric = column_is_numeric(RowBatch(self._pending).column(0))
+        self.renumbered = numeric
+        return numeric
+
+    def __iter__(self):
+        counter = 1
+        for entry in self._chunks:
+            rows = self._chunk_rows(self._load(entry))
+            if self.renumbered:
+                counter = renumber_first_column(rows, counter)
+            yield from rows
+        if self._pending:
+            rows = [list(row) for row in self._pending]
+            if self.renumbered:
+                renumber_first_column(rows, counter)
+            yield from rows
+
+    def close(self):
+        """删除溢出的临时文件，之后不能再迭代"""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
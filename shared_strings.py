@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑的共享字符串表 - 所有字符串以 UTF-8 连续保存在一个缓冲区中，按编号取用时才解码
+
+Python 的 str 列表中每个字符串都是单独的对象（约 50 字节的对象头加上列表中的指针），
+sharedStrings.xml 有数百万条时，在读取第一行之前就占用大量内存。这里只保存 UTF-8 字节和
+array('q') 偏移表，每条额外只占 8 字节。超过 spill_bytes 后缓冲区写入临时文件，
+读取时通过 mmap 访问，只有用到的页面才会进入内存。
+
+最近取用的字符串缓存在 LRU 中，重复出现的值（例如分类列）仍然共享同一个 str 对象。
+"""
+
+import mmap
+import tempfile
+import functools
+from array import array
+
+
+# 缓冲区超过该字节数后写入临时文件并用 mmap 读取
+DEFAULT_SPILL_BYTES = 64 << 20
+
+# 解码结果的缓存条数
+DEFAULT_CACHE_SIZE = 65536
+
+# 写入临时文件时每次写出的字节数
+_WRITE_BYTES = 1 << 20
+
+
+class SharedStringTable:
+    """
+    共享字符串表
+
+    用法与 list 类似：append/extend 依次加入字符串，全部加入后调用 seal()，
+    之后用 table[index] 取字符串、len() 取条数。用完后调用 close() 释放 mmap 和临时文件。
+    """
+
+    def __init__(self, spill_bytes=DEFAULT_SPILL_BYTES, spill_dir=None, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            spill_bytes (int): UTF-8 数据超过该字节数后写入临时文件，None 表示始终保存在内存中
+            spill_dir (str): 临时文件所在目录，None 时使用系统临时目录
+            cache_size (int): 解码结果的 LRU 缓存条数，0 表示不缓存
+        """
+        self.spill_bytes = spill_bytes
+        self.spill_dir = spill_dir
+        self._offsets = array("q", [0])
+        self._buffer = bytearray()
+        self._file = None
+        self._map = None
+        self._data = self._buffer
+        self._get = functools.lru_cache(maxsize=cache_size)(self._decode) if cache_size else self._decode
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    @property
+    def nbytes(self):
+        """UTF-8 数据的字节数"""
+        return self._offsets[-1]
+
+    @property
+    def mapped(self):
+        """数据是否保存在临时文件中"""
+        return self._file is not None
+
+    def append(self, text):
+        encoded = text.encode("utf-8", "surrogatepass")
+        buffer = self._buffer
+        buffer += encoded
+        self._offsets.append(self._offsets[-1] + len(encoded))
+
+        if self._file is not None:
+            if len(buffer) >= _WRITE_BYTES:
+                self._flush()
+        elif self.spill_bytes is not None and len(buffer) > self.spill_bytes:
+            self._file = tempfile.TemporaryFile(prefix="excel_merger_strings_", dir=self.spill_dir)
+            self._data = None
+            self._flush()
+
+    def extend(self, texts):
+        for text in texts:
+            self.append(text)
+
+    def _flush(self):
+        self._file.write(self._buffer)
+        del self._buffer[:]
+
+    def seal(self):
+        """加入完成；数据已写入临时文件时映射到内存"""
+        if self._file is None or self._map is not None:
+            return
+        self._flush()
+        self._file.flush()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = self._map
+
+    def _decode(self, index):
+        offsets = self._offsets
+        return self._data[offsets[index]:offsets[index + 1]].decode("utf-8", "surrogatepass")
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._offsets) - 1
+            if index < 0:
+                raise IndexError("共享字符串编号超出范围")
+        return self._get(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        """释放 mmap 和临时文件"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._data = self._buffer
+        if self._get is not self._decode:
+            self._get.cache_clear()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动时间检查 - 用 python -X importtime 测量导入界面模块的耗时，超出预算时退出码为 1
+
+示例:
+    python startup_budget.py
+    python startup_budget.py --budget-ms 150 --top 15
+    python startup_budget.py --module excel_merger_cli --budget-ms 400 --json startup.json
+
+每次在新的解释器中导入模块（重复 --repeat 次取最小值，减少磁盘缓存和系统负载的影响），报告：
+导入该模块的累计耗时、进程总耗时、累计耗时最多的模块，以及启动时不应导入的模块
+（例如界面启动时的 openpyxl，应在第一次读取 Sheet 或合并时才导入）。
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+
+DEFAULT_MODULE = "excel_merger_gui"
+
+# 导入模块的累计耗时预算（毫秒）
+DEFAULT_BUDGET_MS = 250
+
+# 模块 -> 导入该模块时不应被导入的模块（包括其子模块）
+DEFERRED_MODULES = {
+    "excel_merger_gui": ("merger", "incremental", "parse_cache", "openpyxl", "xlrd", "pyarrow", "numpy"),
+}
+
+
+def parse_importtime(stderr):
+    """
+    解析 -X importtime 的输出
+
+    Returns:
+        list: (模块名, 自身耗时微秒, 累计耗时微秒, 嵌套深度)
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            # 表头行
+            continue
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        records.append((stripped, self_us, cumulative_us, depth))
+    return records
+
+
+def measure_once(module):
+    """
+    在新的解释器中导入 module 一次
+
+    Returns:
+        dict: {"import_ms", "process_ms", "records"}
+    """
+    code = f"import {module}"
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    process_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{completed.stderr.strip()[-2000:]}")
+
+    records = parse_importtime(completed.stderr)
+    target = [cumulative for name, _, cumulative, depth in records if name == module and depth == 0]
+    if not target:
+        raise RuntimeError(f"-X importtime 的输出中没有 {module}")
+    return {"import_ms": target[-1] / 1000, "process_ms": process_ms, "records": records}
+
+
+def measure(module, repeat):
+    """重复测量，返回导入耗时最少的一次"""
+    runs = [measure_once(module) for _ in range(max(1, repeat))]
+    return min(runs, key=lambda run: run["import_ms"])
+
+
+def build_report(module, run, budget_ms, top):
+    """整理测量结果"""
+    records = run["records"]
+    top_level = sorted(
+        ((name, cumulative) for name, _, cumulative, depth in records if depth <= 1 and name != module),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    deferred = DEFERRED_MODULES.get(module, ())
+    names = {name for name, _, _, _ in records}
+    loaded = [
+        heavy for heavy in deferred
+        if any(name == heavy or name.startswith(heavy + ".") for name in names)
+    ]
+    return {
+        "module": module,
+        "python": sys.version.split()[0],
+        "import_ms": round(run["import_ms"], 1),
+        "process_ms": round(run["process_ms"], 1),
+        "budget_ms": budget_ms,
+        "module_count": len(records),
+        "slowest": [{"module": name, "ms": round(cumulative / 1000, 1)} for name, cumulative in top_level],
+        "unexpected_imports": loaded,
+    }
+
+
+def print_report(report):
+    print(f"\n导入 {report['module']}（Python {report['python']}，共 {report['module_count']} 个模块）")
+    print(f"  导入耗时: {report['import_ms']:.1f} ms（预算 {report['budget_ms']} ms）")
+    print(f"  进程总耗时: {report['process_ms']:.1f} ms（含解释器启动）")
+    if report["slowest"]:
+        print("  累计耗时最多的模块:")
+        width = max(len(item["module"]) for item in report["slowest"])
+        for item in report["slowest"]:
+            print(f"    {item['module']:<{width}}  {item['ms']:>8.1f} ms")
+    if report["unexpected_imports"]:
+        print(f"  启动时不应导入的模块: {', '.join(report['unexpected_imports'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查界面模块的导入耗时")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help=f"要导入的模块（默认 {DEFAULT_MODULE}）")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"导入耗时预算，单位毫秒（默认 {DEFAULT_BUDGET_MS}）")
+    parser.add_argument("--repeat", type=int, default=3, help="测量次数，取最小值（默认 3）")
+    parser.add_argument("--top", type=int, default=10, help="列出累计耗时最多的模块数（默认 10）")
+    parser.add_argument("--json", metavar="PATH", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    try:
+        run = measure(args.module, args.repeat)
+    except RuntimeError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    report = build_report(args.module, run, args.budget_ms, args.top)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = False
+    if report["import_ms"] > args.budget_ms:
+        print(f"\n超出预算: {report['import_ms']:.1f} ms > {args.budget_ms} ms")
+        failed = True
+    if report["unexpected_imports"]:
+        print("\n启动时导入了应延迟导入的模块")
+        failed = True
+    if not failed:
+        print("\n启动时间在预算之内")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -44,24 +44,28 @@ def get_stylesheet():
             color: #666666;
         }
         
-        QListWidget {
+        QTableView {
             border: 1px solid #d0d0d0;
             background-color: #f9f9f9;
             border-radius: 2px;
+            gridline-color: #e6e6e6;
+            font-size: 11px;
         }
         
-        QListWidget::item {
-            padding: 2px 4px;
-            margin: 0px;
-            height: 18px;
-            border-bottom: none;
-        }
-        
-        QListWidget::item:selected {
+        QTableView::item:selected {
             background-color: #5b9bd5;
             color: #ffffff;
         }
         
+        QHeaderView::section {
+            background-color: #f5f5f5;
+            border: none;
+            border-right: 1px solid #d0d0d0;
+            border-bottom: 1px solid #d0d0d0;
+            padding: 2px 4px;
+            font-size: 11px;
+        }
+        
         QComboBox {
             border: 1px solid #d0d0d0;
             background-color: #ffffff;
@@ -115,7 +119,7 @@ def get_stylesheet():
             background-color: #e0e0e0;
         }
         
-        QTextEdit {
+        QPlainTextEdit {
             border: 1px solid #d0d0d0;
             background-color: #f0f4f8;
             border-radius: 2px;
@@ -123,6 +127,19 @@ def get_stylesheet():
             padding: 4px;
         }
         
+        QProgressBar {
+            border: 1px solid #d0d0d0;
+            background-color: #f5f5f5;
+            border-radius: 2px;
+            text-align: center;
+            font-size: 11px;
+            min-height: 18px;
+        }
+        
+        QProgressBar::chunk {
+            background-color: #5b9bd5;
+        }
+        
         QScrollBar:vertical {
             background-color: #f5f5f5;
             width: 11px;
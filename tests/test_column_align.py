@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""按表头对齐列的回归测试"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from column_align import ColumnAligner
+
+
+class ColumnMappingTest(unittest.TestCase):
+
+    def test_missing_column_is_none_when_row_is_wider_than_header(self):
+        aligner = ColumnAligner([["ID", "Name", "Amt"]])
+        mapping = aligner.plan([["ID", "Name"]])
+        self.assertEqual(mapping.apply([["d", "w", "stray"]]), [["d", "w", None]])
+
+    def test_reordered_columns_with_short_rows(self):
+        aligner = ColumnAligner([["ID", "Name", "Amt"]])
+        mapping = aligner.plan([["Amt", "ID"]])
+        self.assertEqual(mapping.apply([[30, 3], [40]]), [[3, None, 30], [None, None, 40]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""重复行去除的回归测试"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merger import ExcelMerger, FileExtractResult
+from dedup import RowDeduplicator
+
+
+def make_result(name, header, rows):
+    result = FileExtractResult(name)
+    result.header_rows = [header]
+    result.data_rows = [list(row) for row in rows]
+    result.rows_read = len(rows)
+    return result
+
+
+class DedupTest(unittest.TestCase):
+
+    def test_hash_collision_is_not_a_duplicate(self):
+        # hash(-1) == hash(-2)
+        results = [make_result("a", ["k", "v"], [["a", -1], ["a", -2]])]
+        _, rows, _ = ExcelMerger.collect_results(results, 1, dedup=RowDeduplicator())
+        self.assertEqual(list(rows), [["a", -1], ["a", -2]])
+
+    def test_missing_key_column_ignores_cells_beyond_header(self):
+        results = [
+            make_result("a", ["ID", "Name", "Amt"], [[1, "w", None]]),
+            make_result("b", ["ID", "Name"], [[1, "w", "stray"], [2, "x", "other"]]),
+        ]
+        _, rows, _ = ExcelMerger.collect_results(results, 1, dedup=RowDeduplicator(["Name", "Amt"]))
+        self.assertEqual(list(rows), [[1, "w", None], [2, "x", None]])
+        self.assertEqual(results[1].duplicate_rows, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
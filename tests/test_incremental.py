@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""增量合并的回归测试"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+
+from incremental import incremental_merge, find_previous_output
+
+
+def make_workbook(path, sheet, header, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = sheet
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+class IncrementalMergeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def test_progress_reports_positions_in_all_files(self):
+        for name in ("a", "c"):
+            make_workbook(self.path(f"{name}.xlsx"), "S", ["id", "v"], [[1, name]])
+        first = incremental_merge([self.path("a.xlsx"), self.path("c.xlsx")], "S", 1, ["S"], self.directory)
+
+        # b 是新增的文件，位于两个未修改的文件之间
+        make_workbook(self.path("b.xlsx"), "S", ["id", "v"], [[1, "b"]])
+        files = [self.path("a.xlsx"), self.path("b.xlsx"), self.path("c.xlsx")]
+        os.mkdir(self.path("out"))
+        calls = []
+        result = incremental_merge(
+            files, "S", 1, ["S"], self.path("out"), previous_output=first["output_path"],
+            progress=lambda *args: calls.append(args)
+        )
+
+        self.assertEqual(result["reused_files"], 2)
+        self.assertTrue(calls)
+        self.assertTrue(all(count == len(files) for _, count, _ in calls))
+        self.assertEqual({index for index, _, _ in calls[:-1]}, {1})
+        self.assertEqual(calls[-1], (len(files), len(files), 0))
+
+    def test_previous_output_of_similarly_named_sheet_is_skipped(self):
+        make_workbook(self.path("a.xlsx"), "S", ["id", "v"], [[1, "a"]])
+        make_workbook(self.path("b.xlsx"), "S_old", ["id", "v"], [[1, "b"]])
+        ours = incremental_merge([self.path("a.xlsx")], "S", 1, ["S"], self.directory)
+        # "合并结果_S_old_..." 也匹配 "合并结果_S_*.xlsx"，且按文件名排在后面
+        other = incremental_merge([self.path("b.xlsx")], "S_old", 1, ["S_old"], self.directory)
+
+        self.assertGreater(os.path.basename(other["output_path"]), os.path.basename(ours["output_path"]))
+        self.assertEqual(find_previous_output(self.directory, "S"), ours["output_path"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""解析结果缓存的回归测试"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parse_cache
+from parse_cache import ParseCache
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, "a.xlsx")
+        with open(self.source, "wb") as f:
+            f.write(b"content")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_content_hash_is_computed_once_per_file(self):
+        cache = ParseCache(os.path.join(self.directory, "cache"), hash_content=True)
+        with mock.patch.object(parse_cache, "_fingerprint_from_stat", wraps=parse_cache._fingerprint_from_stat) as fp:
+            for sheet in ("S1", "S2"):
+                self.assertFalse(cache.contains(self.source, sheet, 1))
+                self.assertIsNone(cache.get(self.source, sheet, 1))
+                cache.put(self.source, sheet, 1, {"rows": []})
+                self.assertEqual(cache.get(self.source, sheet, 1), {"rows": []})
+            self.assertEqual(fp.call_count, 1)
+
+            # 文件修改后重新计算
+            with open(self.source, "ab") as f:
+                f.write(b"more")
+            self.assertIsNone(cache.get(self.source, "S1", 1))
+            self.assertEqual(fp.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式 - 监视目录，有文件新增、修改或删除时自动增量合并
+
+Linux 上通过 inotify 得知目录变化（ctypes 调用 libc，无需第三方库），其他平台定时轮询。
+一批连续写入在 debounce 秒内没有新的变化后才处理；仍在写入（大小或修改时间还在变）、
+被 Excel 打开（存在 "~$" 锁文件或无法读取）或文件结构不完整的文件留到下一轮。
+合并结果和锁文件不参与合并，也不会触发合并。
+"""
+
+import os
+import sys
+import time
+import select
+import ctypes
+import ctypes.util
+import zipfile
+import threading
+
+from instrumentation import logger
+from merger import ExcelMerger
+from file_scanner import scan_files
+from incremental import incremental_merge, manifest_path
+
+
+# 最后一次变化后等待的秒数
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+
+# 轮询间隔（秒），使用 inotify 时只用于检查是否停止
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+class _Inotify:
+    """目录的 inotify 句柄，只用来唤醒等待，不解析具体事件"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"无法监视目录 {directory}")
+
+    def wait(self, timeout):
+        """等待事件，返回是否有事件"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _is_locked(file_path):
+    """Excel 打开文件时会在同一目录下生成 "~$" 开头的锁文件（长文件名时替换前两个字符）"""
+    directory, name = os.path.split(file_path)
+    return any(
+        os.path.exists(os.path.join(directory, "~$" + candidate))
+        for candidate in (name, name[2:])
+    )
+
+
+def is_file_ready(file_path):
+    """
+    文件是否可以读取：没有被 Excel 锁定，且文件结构完整（写入到一半的 xlsx 缺少 zip 目录）
+    """
+    if _is_locked(file_path):
+        return False
+    try:
+        if file_path.lower().endswith(".xls"):
+            with open(file_path, "rb") as f:
+                return f.read(len(OLE_SIGNATURE)) == OLE_SIGNATURE
+        return zipfile.is_zipfile(file_path)
+    except OSError:
+        # Windows 上被其他进程独占打开时无法读取
+        return False
+
+
+class DirectoryWatcher:
+    """
+    监视目录中的源文件
+
+    next_change() 阻塞直到有已就绪的变化，返回 (changed, removed)；
+    files() 返回当前已处理的源文件，按修改时间排序（与 scan_excel_files 一致）。
+    """
+
+    def __init__(self, directory, debounce=DEFAULT_DEBOUNCE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+                 stop=None, use_inotify=True):
+        """
+        Args:
+            directory (str): 监视的目录
+            debounce (float): 最后一次变化后等待的秒数
+            poll_interval (float): 轮询间隔（秒）
+            stop (threading.Event): 置位后 next_change() 返回 None
+            use_inotify (bool): 是否尝试使用 inotify，不可用时自动改为轮询
+        """
+        self.directory = directory
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.stop = stop or threading.Event()
+        self._processed = {}
+        self._inotify = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify(directory)
+            except (OSError, AttributeError) as e:
+                logger.debug(f"inotify 不可用，改为轮询: {e}")
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify is not None else "polling"
+
+    def snapshot(self):
+        """源文件 -> (大小, 修改时间)"""
+        records = scan_files(self.directory, sort_by=None)
+        return {record.path: (record.size, record.mtime_ns) for record in records}
+
+    def _wait(self, timeout):
+        """等待目录变化或超时，期间响应停止请求"""
+        deadline = time.monotonic() + timeout
+        while not self.stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            step = min(remaining, self.poll_interval)
+            if self._inotify is not None:
+                if self._inotify.wait(step):
+                    return
+            else:
+                self.stop.wait(step)
+
+    def _settle(self, current):
+        """等到连续 debounce 秒没有变化，返回最终的快照；停止时返回 None"""
+        stable_since = time.monotonic()
+        while True:
+            self._wait(self.debounce)
+            if self.stop.is_set():
+                return None
+            latest = self.snapshot()
+            if latest != current:
+                current = latest
+                stable_since = time.monotonic()
+            elif time.monotonic() - stable_since >= self.debounce:
+                return current
+
+    def next_change(self):
+        """
+        等待下一批已就绪的变化
+
+        Returns:
+            tuple: (changed, removed) 文件路径列表；停止时返回 None
+        """
+        while not self.stop.is_set():
+            current = self.snapshot()
+            if current == self._processed:
+                # inotify 模式下没有事件时一直等待，轮询模式下按间隔重新扫描
+                self._wait(3600 if self._inotify is not None else self.poll_interval)
+                continue
+
+            current = self._settle(current)
+            if current is None:
+                return None
+
+            changed = [
+                path for path, state in current.items()
+                if self._processed.get(path) != state and is_file_ready(path)
+            ]
+            removed = [path for path in self._processed if path not in current]
+            for path in changed:
+                self._processed[path] = current[path]
+            for path in removed:
+                del self._processed[path]
+
+            if changed or removed:
+                return changed, removed
+            # 变化的文件都还不能读取（正在写入或被打开），稍后再试
+            self._wait(self.poll_interval)
+        return None
+
+    def files(self):
+        """已处理的源文件，按修改时间排序"""
+        return sorted(self._processed, key=lambda path: self._processed[path][1])
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def watch_and_merge(directory, target_sheet, header_rows_count, output_dir=None, workers=1, cache=None,
+                    debounce=DEFAULT_DEBOUNCE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL, stop=None,
+                    on_merged=None, prune_previous=False, fast_xlsx=False, align_columns=True):
+    """
+    监视目录，启动时和每批变化后用 incremental_merge 刷新合并结果
+
+    只有新增或修改过的文件会被重新提取，其余数据从上一次的合并结果中复制。
+    单次合并出错只记录日志，继续监视。
+
+    Args:
+        directory (str): 监视的目录
+        target_sheet (str): 要合并的 Sheet 名称
+        header_rows_count (int): 表头行数
+        output_dir (str): 输出目录，默认为监视的目录（合并结果不会触发新的合并）
+        workers (int): 并行解析的进程数
+        cache (ParseCache): 解析结果缓存
+        debounce, poll_interval, stop: 参见 DirectoryWatcher
+        on_merged (callable): 每次刷新后调用 on_merged(result)，result 为 incremental_merge 的返回值
+        prune_previous (bool): 刷新成功后删除本次监视期间生成的上一个合并结果及其清单
+        fast_xlsx (bool): 参见 ExcelMerger.extract_files
+        align_columns (bool): 参见 ExcelMerger.collect_results
+
+    Returns:
+        int: 停止时已完成的刷新次数
+    """
+    output_dir = output_dir or directory
+    refreshes = 0
+    previous_output = None
+
+    with DirectoryWatcher(directory, debounce, poll_interval, stop) as watcher:
+        logger.info(f"开始监视目录（{watcher.mode}）: {directory}")
+        while True:
+            change = watcher.next_change()
+            if change is None:
+                return refreshes
+            changed, removed = change
+            for path in changed:
+                logger.info(f"  新增或修改: {os.path.basename(path)}")
+            for path in removed:
+                logger.info(f"  已删除: {os.path.basename(path)}")
+
+            files = watcher.files()
+            if not files:
+                continue
+            try:
+                index = ExcelMerger.build_sheet_index(files)
+                if target_sheet not in index.union:
+                    logger.warning(f"  警告: 所有文件中都没有 Sheet '{target_sheet}'")
+                    continue
+                result = incremental_merge(
+                    files, target_sheet, header_rows_count, index.union, output_dir,
+                    workers=workers, cache=cache, fast_xlsx=fast_xlsx, align_columns=align_columns
+                )
+            except Exception as e:
+                logger.error(f"  错误: 合并失败: {e}")
+                continue
+
+            if result is None:
+                logger.warning("  警告: 没有找到任何有效数据")
+                continue
+
+            refreshes += 1
+            if prune_previous and previous_output and previous_output != result["output_path"]:
+                for path in (previous_output, manifest_path(previous_output)):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            previous_output = result["output_path"]
+            if on_merged is not None:
+                on_merged(result)
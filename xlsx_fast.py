@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+XLSX 快速读取 - 直接从压缩包中解析 SpreadsheetML，只解码单元格的值
+
+openpyxl 的只读模式即使使用 values_only=True，也要为每个单元格和值元素产生解析事件、
+构造字典并解析坐标。这里按块读取 xl/worksheets/sheetN.xml 中的 <sheetData>，用正则表达式
+一次取出一行中所有单元格的属性和内容（在 C 中完成，不构造 XML 元素），结合 sharedStrings.xml
+和 styles.xml（只用来判断哪些数字是日期）把单元格直接解码为值：数字、共享字符串和内联字符串、
+布尔值、错误值、ISO 日期和序列号日期。结果与 openpyxl 只读模式（data_only=True）逐行相同，
+包括按 <dimension> 补齐行宽和补出缺失的行。
+
+遇到无法处理的内容时（例如严格 OOXML 命名空间、带前缀的元素名、CDATA、图表工作表或解析出错），
+该 Sheet 改用 fallback 读取后端读取，已经产出的行会被跳过，调用方看到的仍是连续的行。
+"""
+
+import os
+import re
+import html
+import posixpath
+import itertools
+import zipfile
+import xml.etree.ElementTree as ET
+
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import from_excel, from_ISO8601, WINDOWS_EPOCH, MAC_EPOCH
+
+from instrumentation import logger
+from shared_strings import SharedStringTable, DEFAULT_SPILL_BYTES
+
+
+OFFICE_DOCUMENT_REL = "/officeDocument"
+WORKSHEET_REL = "/worksheet"
+SHARED_STRINGS_REL = "/sharedStrings"
+STYLES_REL = "/styles"
+
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+_TEXT = f"{{{SHEET_MAIN_NS}}}t"
+_RUN = f"{{{SHEET_MAIN_NS}}}r"
+_STRING_ITEM = f"{{{SHEET_MAIN_NS}}}si"
+_WORKSHEET = f"{{{SHEET_MAIN_NS}}}worksheet"
+
+_DIGITS = "0123456789"
+
+# 每次解析的工作表 XML 字节数
+BLOCK_BYTES = 1 << 20
+
+# 只读取 <dimension> 时每次读取的字节数，它位于工作表 XML 的开头
+HEAD_BYTES = 8192
+
+_DECLARATION_RE = re.compile(rb"<\?xml[^>]*\bencoding=[\"']([^\"']+)[\"']")
+_ROOT_RE = re.compile(rb"<worksheet\b[^>]*>")
+_DIMENSION_RE = re.compile(rb"<dimension\b[^>]*\bref=\"([^\"]*)\"")
+_SHEET_DATA_RE = re.compile(rb"<sheetData\b[^>]*?(/?)>")
+
+# 一行：属性和内容
+_ROW_RE = re.compile(r"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+_ROW_NUMBER_RE = re.compile(r"(?:^|\s)r\s*=\s*[\"']([^\"']*)[\"']")
+# 一个单元格。第一种写法是 Excel 的属性顺序 r、s、t（前 5 组：列字母、样式、类型、其余属性、内容），
+# 其他写法由第二种取出全部属性和内容（后 2 组）
+_CELL_RE = re.compile(
+    r"<c\s+r=\"([A-Z]{1,3})[0-9]+\"(?:\s+s=\"([0-9]+)\")?(?:\s+t=\"([a-zA-Z]+)\")?([^>]*?)(?:/>|>(.*?)</c>)"
+    r"|<c\b([^>]*?)(?:/>|>(.*?)</c>)",
+    re.S,
+)
+_ATTR_RE = re.compile(r"([\w:]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)')")
+_VALUE_RE = re.compile(r"<v(?:\s[^>]*)?>([^<]*)</v>")
+_INLINE_RE = re.compile(r"<is\b[^>]*>(.*?)</is>", re.S)
+_PHONETIC_RE = re.compile(r"<rPh\b.*?</rPh>", re.S)
+_TEXT_RE = re.compile(r"<t(?:\s[^>]*)?>([^<]*)</t>")
+
+
+def local_name(tag):
+    """去掉 XML 标签的命名空间"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def workbook_part(zf):
+    """从 _rels/.rels 中找到 workbook.xml 在压缩包中的位置"""
+    try:
+        with zf.open("_rels/.rels") as f:
+            for _, elem in ET.iterparse(f):
+                if (local_name(elem.tag) == "Relationship"
+                        and elem.get("Type", "").endswith(OFFICE_DOCUMENT_REL)):
+                    return posixpath.normpath(elem.get("Target").lstrip("/"))
+    except KeyError:
+        pass
+    return "xl/workbook.xml"
+
+
+def _rels_path(part):
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def _read_rels(zf, part):
+    """读取 part 的关系：Id -> (Type, 压缩包中的路径)"""
+    rels = {}
+    try:
+        f = zf.open(_rels_path(part))
+    except KeyError:
+        return rels
+    directory = posixpath.dirname(part)
+    with f:
+        for _, elem in ET.iterparse(f):
+            if local_name(elem.tag) != "Relationship" or elem.get("TargetMode") == "External":
+                continue
+            target = elem.get("Target", "")
+            if target.startswith("/"):
+                path = target.lstrip("/")
+            else:
+                path = posixpath.normpath(posixpath.join(directory, target))
+            rels[elem.get("Id")] = (elem.get("Type", ""), path)
+    return rels
+
+
+def _text_content(node):
+    """<si> 的纯文本：<t> 加上各个 <r> 中的 <t>，忽略注音 <rPh>（与 openpyxl 的 Text.content 相同）"""
+    snippets = []
+    for child in node:
+        tag = child.tag
+        if tag == _TEXT:
+            if child.text is not None:
+                snippets.append(child.text)
+        elif tag == _RUN:
+            text = child.findtext(_TEXT)
+            if text is not None:
+                snippets.append(text)
+    return "".join(snippets)
+
+
+def _xml_text(text):
+    """还原 XML 文本：换行规范化为 \\n，解码实体引用（XML 只有 5 个预定义实体和数字引用）"""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+def _attributes(text):
+    """属性字符串 -> dict"""
+    return {name: _xml_text(double if double or not single else single)
+            for name, double, single in _ATTR_RE.findall(text)}
+
+
+def _inline_text(inner):
+    """<c> 内容中 <is> 的纯文本，忽略注音；没有 <is> 时返回 None"""
+    match = _INLINE_RE.search(inner)
+    if match is None:
+        return None
+    return _xml_text("".join(_TEXT_RE.findall(_PHONETIC_RE.sub("", match.group(1)))))
+
+
+class _Unsupported(Exception):
+    """快速读取无法处理的内容，改用 fallback 读取"""
+
+
+def _read_sheet(source):
+    """
+    读取工作表 XML 中 <sheetData> 之前的部分，返回 (dimension 的 ref, 行块的迭代器)
+
+    <sheetData> 中的内容按块读取：每次读取约 BLOCK_BYTES 字节，截到最后一个完整的 </row>。
+    """
+    buffer = b""
+    while True:
+        match = _SHEET_DATA_RE.search(buffer)
+        if match:
+            break
+        chunk = source.read(BLOCK_BYTES)
+        if not chunk:
+            raise _Unsupported("没有找到 <sheetData>")
+        buffer += chunk
+
+    head = buffer[:match.start()]
+    declaration = _DECLARATION_RE.match(head)
+    if declaration and declaration.group(1).lower() not in (b"utf-8", b"utf8"):
+        raise _Unsupported(f"不支持的编码: {declaration.group(1)!r}")
+    root = _ROOT_RE.search(head)
+    if root is None or ET.fromstring(root.group(0) + b"</worksheet>").tag != _WORKSHEET:
+        # 带前缀的元素名或严格 OOXML 的命名空间
+        raise _Unsupported("根元素不是 SpreadsheetML 的 <worksheet>")
+    dimension = _DIMENSION_RE.search(head)
+    dimension = dimension.group(1).decode() if dimension else None
+
+    if match.group(1):
+        # <sheetData/>
+        return dimension, iter(())
+    return dimension, _row_blocks(source, buffer[match.end():])
+
+
+def _row_blocks(source, buffer):
+    """逐块产出 <sheetData> 中的内容（str），每块都由完整的行组成"""
+    while True:
+        stop = buffer.find(b"</sheetData>")
+        if stop >= 0:
+            block, buffer = buffer[:stop], b""
+        else:
+            cut = buffer.rfind(b"</row>")
+            if cut >= 0:
+                cut += len(b"</row>")
+                block, buffer = buffer[:cut], buffer[cut:]
+            else:
+                block = b""
+
+        if block:
+            if b"<!--" in block or b"<![CDATA[" in block or b"<?" in block:
+                raise _Unsupported("行中含有注释、CDATA 或处理指令")
+            yield block.decode("utf-8")
+        if stop >= 0:
+            return
+
+        chunk = source.read(BLOCK_BYTES)
+        if not chunk:
+            raise _Unsupported("<sheetData> 不完整")
+        buffer += chunk
+
+
+class FastXlsxReader:
+    """
+    XLSX 快速读取后端，接口与 OpenpyxlReader 相同（sheet_names、iter_rows、close）
+
+    Args:
+        file_path (str): XLSX 文件路径
+        fallback: 无法处理时使用的读取后端类，例如 OpenpyxlReader，按需才打开
+        strings_spill_bytes (int): 共享字符串超过该字节数后放到临时文件中用 mmap 读取，参见 SharedStringTable
+    """
+
+    def __init__(self, file_path, fallback=None, strings_spill_bytes=DEFAULT_SPILL_BYTES):
+        self.file_path = file_path
+        self.strings_spill_bytes = strings_spill_bytes
+        self._fallback_class = fallback
+        self._fallback = None
+        self._zf = zipfile.ZipFile(file_path)
+        try:
+            self._read_workbook()
+        except Exception:
+            self._zf.close()
+            raise
+        self._shared_strings = None
+        self._date_styles = None
+        # 列字母 -> 列号
+        self._columns = {}
+        self._last_column = 0
+
+    def _read_workbook(self):
+        part = workbook_part(self._zf)
+        rels = _read_rels(self._zf, part)
+        self._rels = rels
+        self._sheets = {}
+        self._sheet_names = []
+        self.epoch = WINDOWS_EPOCH
+        with self._zf.open(part) as f:
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                name = local_name(elem.tag)
+                if event == "start" and name == "workbookPr":
+                    if elem.get("date1904", "false") not in ("false", "f", "0", ""):
+                        self.epoch = MAC_EPOCH
+                elif event == "start" and name == "sheet":
+                    sheet_name = elem.get("name")
+                    self._sheet_names.append(sheet_name)
+                    self._sheets[sheet_name] = rels.get(elem.get(f"{{{REL_NS}}}id"))
+                elif event == "end" and name == "sheets":
+                    break
+
+    @property
+    def sheet_names(self):
+        return self._sheet_names
+
+    def _part_of_type(self, rel_type):
+        for kind, path in self._rels.values():
+            if kind.endswith(rel_type):
+                return path
+        return None
+
+    def _load_shared_strings(self):
+        """
+        共享字符串表，与 openpyxl 一样去掉 "x005F_" 转义
+
+        Returns:
+            SharedStringTable: 紧凑保存的字符串，按编号取用时才解码
+        """
+        strings = SharedStringTable(self.strings_spill_bytes)
+        part = self._part_of_type(SHARED_STRINGS_REL)
+        if part is None:
+            return strings
+        try:
+            f = self._zf.open(part)
+        except KeyError:
+            return strings
+        with f:
+            root = None
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if root is None:
+                    root = elem
+                elif event == "end" and elem.tag == _STRING_ITEM:
+                    strings.append(_text_content(elem).replace("x005F_", ""))
+                    # 从 <sst> 中移除已处理的条目，内存不随条数增长
+                    root.clear()
+        strings.seal()
+        return strings
+
+    def _load_date_styles(self):
+        """
+        数字格式为日期或时长的单元格样式编号
+
+        Returns:
+            dict: 样式编号（字符串，与 s 属性相同）-> 是否为时长格式
+        """
+        part = self._part_of_type(STYLES_REL)
+        if part is None:
+            return {}
+        try:
+            f = self._zf.open(part)
+        except KeyError:
+            return {}
+
+        custom = {}
+        formats = []
+        in_cell_xfs = False
+        with f:
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                name = local_name(elem.tag)
+                if event == "start":
+                    if name == "cellXfs":
+                        in_cell_xfs = True
+                    elif name == "xf" and in_cell_xfs:
+                        formats.append(int(elem.get("numFmtId", 0)))
+                elif name == "numFmt":
+                    custom[int(elem.get("numFmtId"))] = elem.get("formatCode")
+                elif name == "cellXfs":
+                    break
+
+        date_styles = {}
+        for idx, fmt_id in enumerate(formats):
+            fmt = custom[fmt_id] if fmt_id in custom else builtin_format_code(fmt_id)
+            if is_date_format(fmt):
+                date_styles[str(idx)] = is_timedelta_format(fmt)
+        return date_styles
+
+    def iter_rows(self, sheet_name):
+        """逐行产出单元格值元组；无法处理时从 fallback 读取后端的相同位置继续"""
+        rows = self._iter_sheet(sheet_name)
+        produced = 0
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except Exception as e:
+                if self._fallback_class is None:
+                    raise
+                logger.debug(f"  {os.path.basename(self.file_path)} / {sheet_name} 改用 openpyxl 读取: {e}")
+                break
+            yield row
+            produced += 1
+
+        if self._fallback is None:
+            self._fallback = self._fallback_class(self.file_path)
+        yield from itertools.islice(self._fallback.iter_rows(sheet_name), produced, None)
+
+    def sheet_dimension(self, sheet_name):
+        """
+        工作表 <dimension> 的 ref（例如 "A1:F2000"），只读取 <sheetData> 之前的部分
+
+        Returns:
+            str: 没有该工作表或没有 <dimension> 时返回 None
+        """
+        rel = self._sheets.get(sheet_name)
+        if rel is None or not rel[0].endswith(WORKSHEET_REL):
+            return None
+        head = b""
+        with self._zf.open(rel[1]) as f:
+            while True:
+                chunk = f.read(HEAD_BYTES)
+                if not chunk:
+                    break
+                head += chunk
+                match = _DIMENSION_RE.search(head)
+                if match:
+                    return match.group(1).decode()
+                if _SHEET_DATA_RE.search(head):
+                    break
+        return None
+
+    def _iter_sheet(self, sheet_name):
+        rel = self._sheets.get(sheet_name)
+        if rel is None or not rel[0].endswith(WORKSHEET_REL):
+            raise _Unsupported("不是普通工作表")
+        if self._shared_strings is None:
+            self._shared_strings = self._load_shared_strings()
+        if self._date_styles is None:
+            self._date_styles = self._load_date_styles()
+
+        with self._zf.open(rel[1]) as f:
+            yield from self._parse_rows(f)
+
+    def _parse_rows(self, source):
+        """
+        解析工作表 XML，行宽和缺失行的处理与 openpyxl 只读模式相同：
+        有 <dimension> 时每行补齐到最大列并补出缺失的行，否则每行到最后一个单元格为止
+        """
+        dimension, blocks = _read_sheet(source)
+        max_col = max_row = None
+        empty_row = []
+        if dimension is not None:
+            boundaries = range_boundaries(dimension)
+            max_col, max_row = boundaries[2], boundaries[3]
+            # 部分软件导出的文件把尺寸错误地写成 "A1"，此时按实际内容读取（与 OpenpyxlReader 一致）
+            if max_col == 1 and max_row == 1:
+                max_col = max_row = None
+            if max_col is not None:
+                empty_row = (None,) * max_col
+
+        counter = 1
+        row_counter = 0
+        truncated = False
+
+        for block in blocks:
+            for row_attrs, body in _ROW_RE.findall(block):
+                number = _ROW_NUMBER_RE.search(row_attrs)
+                if number is not None:
+                    try:
+                        row_counter = int(number.group(1))
+                    except ValueError:
+                        raise _Unsupported(f"行号无效: {number.group(1)}")
+                else:
+                    row_counter += 1
+                idx = row_counter
+
+                if max_row is not None and idx > max_row:
+                    truncated = True
+                    break
+                # 缺失的行
+                while counter < idx:
+                    counter += 1
+                    yield empty_row
+                if counter > idx:
+                    # 重复或倒序的行，openpyxl 同样跳过
+                    continue
+                counter += 1
+
+                values = self._decode_cells(body)
+                width = max_col if max_col is not None else self._last_column
+                if len(values) > width:
+                    del values[width:]
+                elif len(values) < width:
+                    values.extend([None] * (width - len(values)))
+                yield tuple(values)
+            if truncated:
+                break
+
+        # 与 openpyxl 相同，只有超出 <dimension> 的行被截断时才补齐到最后一行
+        if truncated:
+            while counter <= max_row:
+                counter += 1
+                yield empty_row
+
+    def _decode_cells(self, body):
+        """
+        解码一行中的单元格
+
+        Returns:
+            list: 按列位置排列的值，self._last_column 为最后一个单元格的列号
+        """
+        strings = self._shared_strings
+        date_styles = self._date_styles
+        columns = self._columns
+        values = []
+        column = 0
+
+        for letters, style, data_type, rest, inner, attrs, other_inner in _CELL_RE.findall(body):
+            if letters:
+                if rest and not rest.isspace():
+                    extra = _attributes(rest)
+                    style = extra.get("s", style)
+                    data_type = extra.get("t", data_type)
+                column = columns.get(letters)
+                if column is None:
+                    column = columns[letters] = column_index_from_string(letters)
+            else:
+                attrs = _attributes(attrs)
+                inner = other_inner
+                style = attrs.get("s", "")
+                data_type = attrs.get("t", "")
+                ref = attrs.get("r")
+                if ref:
+                    column = column_index_from_string(ref.rstrip(_DIGITS))
+                else:
+                    column += 1
+
+            if data_type == "inlineStr":
+                value = _inline_text(inner)
+            else:
+                if inner.startswith("<v>") and inner.endswith("</v>") and inner.count("<") == 2:
+                    value = inner[3:-4]
+                else:
+                    match = _VALUE_RE.search(inner)
+                    value = match.group(1) if match else None
+                if value:
+                    if not data_type or data_type == "n":
+                        if "." in value or "E" in value or "e" in value:
+                            value = float(value)
+                        else:
+                            value = int(value)
+                        if date_styles:
+                            timedelta = date_styles.get(style or "0")
+                            if timedelta is not None:
+                                try:
+                                    value = from_excel(value, self.epoch, timedelta=timedelta)
+                                except (OverflowError, ValueError):
+                                    value = "#VALUE!"
+                    elif data_type == "s":
+                        value = strings[int(value)]
+                    elif data_type == "b":
+                        value = bool(int(value))
+                    elif data_type == "d":
+                        value = from_ISO8601(_xml_text(value))
+                    else:
+                        value = _xml_text(value)
+                else:
+                    value = None
+
+            size = len(values)
+            if column == size + 1:
+                values.append(value)
+            elif column > size:
+                values.extend([None] * (column - 1 - size))
+                values.append(value)
+            else:
+                values[column - 1] = value
+
+        self._last_column = column
+        return values
+
+    def close(self):
+        self._zf.close()
+        if self._shared_strings is not None:
+            self._shared_strings.close()
+            self._shared_strings = None
+        if self._fallback is not None:
+            self._fallback.close()
+            self._fallback = None
+
+
+def estimate_rows(file_path, sheet_name):
+    """
+    根据工作表的 <dimension> 估计行数（包括表头和空行），不读取单元格
+
+    Returns:
+        int: 估计的行数；不是 XLSX、没有该工作表或没有可靠的尺寸信息时返回 None
+    """
+    try:
+        reader = FastXlsxReader(file_path)
+    except Exception:
+        return None
+    try:
+        ref = reader.sheet_dimension(sheet_name)
+        if not ref:
+            return None
+        boundaries = range_boundaries(ref)
+        max_col, max_row = boundaries[2], boundaries[3]
+        # 与读取时相同，"A1" 视为没有尺寸信息
+        if max_col == 1 and max_row == 1:
+            return None
+        return max_row
+    except Exception:
+        return None
+    finally:
+        reader.close()